@@ -0,0 +1,260 @@
+import asyncio
+import ipaddress
+import math
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .auth import verify_token
+from .config import settings
+from .metrics import ADMISSION_ACTIVE, ADMISSION_REJECTED, ADMISSION_WAITING
+
+# Admission control. Requests are sorted into route classes before the app
+# reads their body, so an upload refused here never touches the disk:
+#   upload  request bodies carrying media, and finalizes that hash or move it
+#   read    report reads (DB + serialization)
+#   export  report exports, which hold their slot until the download ends
+# Each class has a concurrency limit with a bounded, time-limited queue.
+# Starting a new upload also takes a token from the user's bucket. Password
+# hashing (the auth class) is bounded by the password pool, see auth.py.
+# Media files, /health and /metrics are not limited: media bytes go to nginx
+# in production and the probes must answer under overload.
+
+UPLOAD = "upload"
+READ = "read"
+EXPORT = "export"
+
+# (method, path pattern, route class, takes a rate-limit token)
+_ROUTES = [
+    ("POST", re.compile(r"/reports/?$"), UPLOAD, True),
+    ("POST", re.compile(r"/reports/batch$"), UPLOAD, True),
+    ("POST", re.compile(r"/reports/uploads$"), None, True),
+    ("POST", re.compile(r"/reports/uploads/resumable$"), None, True),
+    ("PATCH", re.compile(r"/reports/uploads/resumable/[^/]+$"), UPLOAD, False),
+    ("POST", re.compile(r"/reports/uploads/resumable/[^/]+/finalize$"), UPLOAD, False),
+    ("POST", re.compile(r"/reports/finalize$"), UPLOAD, False),
+    ("PUT", re.compile(r"/uploads/direct/[^/]+$"), UPLOAD, False),
+    ("GET", re.compile(r"/reports/export/?$"), EXPORT, False),
+    ("GET", re.compile(r"/reports(/.*)?$"), READ, False),
+    ("GET", re.compile(r"/auth/me$"), READ, False),
+]
+
+# Room for the form fields and part headers around the media of a multipart body
+_MULTIPART_OVERHEAD = 1024 * 1024
+
+# (method, path pattern, largest Content-Length accepted); ingest still
+# counts the bytes, for bodies sent without a length
+_BODY_LIMITS = [
+    ("POST", re.compile(r"/reports/?$"), settings.MAX_VIDEO_SIZE + _MULTIPART_OVERHEAD),
+    (
+        "POST",
+        re.compile(r"/reports/batch$"),
+        settings.MAX_VIDEO_SIZE * settings.BATCH_MAX_ITEMS + _MULTIPART_OVERHEAD,
+    ),
+]
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused by a limiter"""
+
+    def __init__(self, status_code: int, retry_after: Optional[float], detail: str, reason: str):
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` requests run at once; up to `queue_size` more wait, each
+    for at most `timeout` seconds. Anything beyond is rejected immediately.
+    A limit of 0 disables the limiter.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        # Created lazily so the semaphore belongs to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _busy(self, detail: str, reason: str) -> AdmissionRejected:
+        return AdmissionRejected(
+            status.HTTP_503_SERVICE_UNAVAILABLE, max(self.timeout, 1), detail, reason
+        )
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self.limit <= 0:
+            yield
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+
+        if self._semaphore.locked():
+            if self.waiting >= self.queue_size:
+                raise self._busy("Server is busy, retry later", "queue_full")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                raise self._busy("Server is busy, retry later", "queue_timeout")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+
+class TokenBucketLimiter:
+    """
+    Per-key token buckets holding up to `burst` tokens and refilled at
+    `per_minute` tokens a minute. Only the most recently used `max_keys`
+    buckets are kept; a forgotten bucket comes back full.
+    """
+
+    def __init__(self, per_minute: float, burst: int, max_keys: int = 10000):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def acquire(self, key: str) -> float:
+        """Take a token for key; return 0 on success, else seconds until one is available"""
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+limiters = {
+    UPLOAD: ConcurrencyLimiter(
+        UPLOAD, settings.UPLOAD_CONCURRENCY, settings.UPLOAD_QUEUE_SIZE, settings.UPLOAD_QUEUE_TIMEOUT
+    ),
+    READ: ConcurrencyLimiter(
+        READ, settings.READ_CONCURRENCY, settings.READ_QUEUE_SIZE, settings.READ_QUEUE_TIMEOUT
+    ),
+    EXPORT: ConcurrencyLimiter(
+        EXPORT, settings.EXPORT_CONCURRENCY, settings.EXPORT_QUEUE_SIZE, settings.EXPORT_QUEUE_TIMEOUT
+    ),
+}
+upload_rate = TokenBucketLimiter(settings.UPLOAD_RATE_PER_MINUTE, settings.UPLOAD_RATE_BURST)
+
+for _name, _limiter in limiters.items():
+    ADMISSION_ACTIVE.labels(_name).set_function(lambda limiter=_limiter: limiter.active)
+    ADMISSION_WAITING.labels(_name).set_function(lambda limiter=_limiter: limiter.waiting)
+
+
+_trusted_proxies = [ipaddress.ip_network(proxy, strict=False) for proxy in settings.TRUSTED_PROXIES]
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in _trusted_proxies)
+
+
+def classify(method: str, path: str) -> Tuple[Optional[str], bool]:
+    """Return (route class or None, whether the request takes an upload token)"""
+    for route_method, pattern, route_class, rate_limited in _ROUTES:
+        if method == route_method and pattern.match(path):
+            return route_class, rate_limited
+    return None, False
+
+
+def body_too_large(method: str, path: str, content_length: Optional[str]) -> bool:
+    """Whether the declared body size exceeds what the route can accept"""
+    if content_length is None or not content_length.isdigit():
+        return False
+    for route_method, pattern, limit in _BODY_LIMITS:
+        if method == route_method and pattern.match(path):
+            return int(content_length) > limit
+    return False
+
+
+def client_key(connection: HTTPConnection) -> str:
+    """The user a request is made for (token subject), else the client address"""
+    authorization = connection.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    else:
+        token = connection.cookies.get("access_token")
+    email = verify_token(token) if token else None
+    if email:
+        return f"user:{email}"
+    host = connection.client.host if connection.client else "unknown"
+    if _is_trusted_proxy(host):
+        # Only a proxy we run may say who the client is; anyone can send the header
+        host = connection.headers.get("x-real-ip") or host
+    return f"addr:{host}"
+
+
+class AdmissionMiddleware:
+    """
+    Applies the limits above before the request reaches the router and
+    answers refused requests itself: 413 when an upload declares a body
+    larger than its route accepts, 429 when a user exceeds their upload
+    rate, 503 when a route class is saturated, the last two with Retry-After.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class, rate_limited = classify(scope["method"], scope["path"])
+        try:
+            connection = HTTPConnection(scope)
+            if body_too_large(scope["method"], scope["path"], connection.headers.get("content-length")):
+                raise AdmissionRejected(
+                    status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, None, "Upload is too large", "too_large"
+                )
+            if rate_limited:
+                wait = upload_rate.acquire(client_key(connection))
+                if wait:
+                    raise AdmissionRejected(
+                        status.HTTP_429_TOO_MANY_REQUESTS, wait, "Too many uploads, slow down", "rate_limited"
+                    )
+            if route_class is None:
+                await self.app(scope, receive, send)
+                return
+            async with limiters[route_class].slot():
+                await self.app(scope, receive, send)
+        except AdmissionRejected as e:
+            ADMISSION_REJECTED.labels(route_class or UPLOAD, e.reason).inc()
+            headers = {}
+            if e.retry_after is not None:
+                headers["Retry-After"] = str(math.ceil(e.retry_after))
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=headers)
+            await response(scope, receive, send)
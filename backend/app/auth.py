@@ -1,11 +1,43 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, TypeVar
+import asyncio
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from .config import settings
 
+T = TypeVar("T")
+
+PASSWORD_SCHEMES = ("argon2", "bcrypt")
+
+
+def _build_password_context() -> CryptContext:
+    """
+    The configured scheme hashes new passwords; the other one is still
+    accepted but marked deprecated, so it is replaced on the next login
+    """
+    scheme = settings.PASSWORD_HASH_SCHEME.lower()
+    if scheme not in PASSWORD_SCHEMES:
+        raise RuntimeError(f"Unknown PASSWORD_HASH_SCHEME {settings.PASSWORD_HASH_SCHEME!r}")
+    if scheme == "argon2":
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            raise RuntimeError("PASSWORD_HASH_SCHEME=argon2 requires argon2-cffi (pip install argon2-cffi)")
+    return CryptContext(
+        schemes=[scheme] + [other for other in PASSWORD_SCHEMES if other != scheme],
+        default=scheme,
+        deprecated="auto",
+        bcrypt__rounds=settings.BCRYPT_ROUNDS,
+        argon2__type="ID",
+        argon2__time_cost=settings.ARGON2_TIME_COST,
+        argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+        argon2__parallelism=settings.ARGON2_PARALLELISM,
+    )
+
+
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = _build_password_context()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -18,6 +50,60 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasherBusy(Exception):
+    """Raised when more password operations are pending than the queue allows"""
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a dedicated thread pool so a burst of logins never
+    blocks the event loop (bcrypt and argon2 release the GIL while hashing).
+    At most workers + queue_size operations are admitted; further callers are
+    rejected at once rather than piling up behind work they would time out on.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._capacity = workers + queue_size
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self) -> None:
+        self._pending -= 1
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        if self._pending >= self._capacity:
+            raise PasswordHasherBusy()
+        loop = asyncio.get_running_loop()
+        future = self._executor.submit(fn, *args)
+        self._pending += 1
+        # Released when the thread finishes, even if the awaiting request is cancelled
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE)
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password on the password pool"""
+    return await password_hasher.run(pwd_context.hash, password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password on the password pool. Returns (valid, new_hash), where
+    new_hash is set when the stored hash uses an outdated scheme or cost
+    """
+    return await password_hasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -43,39 +129,3 @@ def verify_token(token: str) -> Optional[str]:
         return email
     except JWTError:
         return None
-
-from fastapi import Depends, HTTPException, status, Request
-from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from .database import get_db
-from . import models
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
-
-async def get_current_user(
-    request: Request,
-    token: Optional[str] = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    # Try to get token from cookie if not in header
-    if not token:
-        token = request.cookies.get("access_token")
-        
-    if not token:
-        raise credentials_exception
-        
-    email = verify_token(token)
-    if email is None:
-        raise credentials_exception
-        
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if user is None:
-        raise credentials_exception
-        
-    return user
@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries also expire after ttl seconds
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Remove a key if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SizedLRUCache:
+    """
+    Thread-safe LRU cache of byte strings (or (bytes, extra) tuples) bounded
+    by the total size of the bytes it holds rather than by entry count
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, size: int) -> None:
+        """Store a value of `size` bytes, evicting least recently used entries to fit"""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.size -= previous[0]
+            self._data[key] = (size, value)
+            self.size += size
+            while self.size > self.max_bytes:
+                evicted_size, _ = self._data.popitem(last=False)[1]
+                self.size -= evicted_size
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class VersionCounter:
+    """Thread-safe per-key counters, all starting at zero"""
+
+    def __init__(self):
+        self._versions: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> int:
+        return self._versions.get(key, 0)
+
+    def bump(self, key: Hashable) -> int:
+        """Increment a key's counter and return the new value"""
+        with self._lock:
+            version = self._versions.get(key, 0) + 1
+            self._versions[key] = version
+            return version
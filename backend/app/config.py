@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -8,17 +8,134 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days
     
+    # Authenticated user cache (per process)
+    USER_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL_SECONDS: int = 60
+    
+    # Admission control: requests beyond these limits fail fast with
+    # 503 (class saturated) or 429 (user over their upload rate) and Retry-After.
+    # A concurrency of 0 disables that class's limit; a rate of 0 disables rate limiting.
+    UPLOAD_CONCURRENCY: int = 2  # Upload bodies received and processed at once
+    UPLOAD_QUEUE_SIZE: int = 8  # Uploads allowed to wait for a slot
+    UPLOAD_QUEUE_TIMEOUT: float = 15.0  # Seconds an upload waits before 503
+    UPLOAD_RATE_PER_MINUTE: float = 30.0  # New uploads per user (token bucket refill)
+    UPLOAD_RATE_BURST: int = 10  # Uploads a user may start back to back
+    READ_CONCURRENCY: int = 32  # Report reads served at once
+    READ_QUEUE_SIZE: int = 128
+    READ_QUEUE_TIMEOUT: float = 5.0
+    EXPORT_CONCURRENCY: int = 2  # Exports streamed at once; a download holds its slot throughout
+    EXPORT_QUEUE_SIZE: int = 4
+    EXPORT_QUEUE_TIMEOUT: float = 10.0
+    # Peers (IPs or CIDR ranges, e.g. the nginx container's network) whose X-Real-IP
+    # header names the client; requests from anywhere else are keyed by their own address
+    TRUSTED_PROXIES: List[str] = []
+    
+    # Password hashing: "bcrypt" or "argon2" (argon2id, needs argon2-cffi). Hashes in
+    # the other scheme or with older cost settings are upgraded on the next login.
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 1
+    PASSWORD_HASH_WORKERS: int = 2  # Threads hashing passwords, off the event loop
+    PASSWORD_HASH_QUEUE_SIZE: int = 32  # Operations allowed to wait; beyond that, 503
+    
     # Database
     DATABASE_URL: str = "sqlite:///./app_v2.db"
+    ASYNC_DATABASE_URL: Optional[str] = None  # Derived from DATABASE_URL (aiosqlite/asyncpg) when unset
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    
+    # SQLite production profile (applied on every new connection)
+    SQLITE_TUNING: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT: int = 5000  # Milliseconds
+    SQLITE_CACHE_SIZE: int = -16000  # Negative = KiB, i.e. 16MB page cache
+    SQLITE_MMAP_SIZE: int = 268435456  # 256MB memory-mapped I/O
+    
+    # Full-text search (PostgreSQL text search configuration, e.g. 'simple', 'english', 'french')
+    SEARCH_LANGUAGE: str = "simple"
+
+    # Map clusters: cells are coarsened until the requested area holds at most this many
+    MAX_MAP_CLUSTERS: int = 2048
     
     # File Storage
     UPLOAD_DIR: str = "./uploads"
     MAX_IMAGE_SIZE: int = 10485760  # 10MB
     MAX_VIDEO_SIZE: int = 52428800  # 50MB
+    UPLOAD_CHUNK_SIZE: int = 1048576  # 1MB blocks when streaming uploads to disk
+    THUMBNAIL_WORKERS: int = 2  # Processes generating thumbnails in the background
+    
+    BATCH_MAX_ITEMS: int = 20  # Reports accepted by one POST /reports/batch
+    
+    # Resumable uploads (size limits are MAX_IMAGE_SIZE / MAX_VIDEO_SIZE)
+    RESUMABLE_SESSION_TTL_SECONDS: int = 86400  # Sessions idle this long are deleted
+    RESUMABLE_GC_INTERVAL_SECONDS: int = 3600
+    RESUMABLE_MAX_SESSIONS_PER_USER: int = 5
+    
+    # Media garbage collection. Deleted media is removed by a background reaper;
+    # reconciliation removes unreferenced files and temp files older than the
+    # grace period, which must exceed the longest upload still in flight
+    MEDIA_REAPER_INTERVAL_SECONDS: int = 30
+    MEDIA_REAPER_BATCH_SIZE: int = 100  # Tombstones handled per pass
+    ORPHAN_SCAN_INTERVAL_SECONDS: int = 86400
+    ORPHAN_GRACE_SECONDS: int = 86400
+    
+    # Rendered report list/detail responses cached per process, keyed by the
+    # user's data version (0 disables the cache; ETags are always sent)
+    PAGE_CACHE_MAX_BYTES: int = 33554432  # 32MB
+    
+    # Export: rows fetched per server-side cursor batch
+    EXPORT_BATCH_SIZE: int = 1000
+    
+    # Image renditions: name -> longest edge in pixels
+    IMAGE_RENDITIONS: Dict[str, int] = {"thumb": 300, "detail": 1080, "full": 2048}
+    RENDITION_FORMAT: str = "WEBP"  # Falls back to JPEG if Pillow lacks WebP support
+    RENDITION_QUALITY: int = 80
+    
+    # Storage driver: "local" (UPLOAD_DIR on this host) or "s3" (any S3-compatible store)
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: str = "reports-media"
+    S3_ENDPOINT_URL: Optional[str] = None  # e.g. http://minio:9000; None for AWS
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    PRESIGNED_URL_EXPIRE_SECONDS: int = 900  # Lifetime of direct upload/download URLs
+    
+    # Media delivery
+    MEDIA_CACHE_MAX_AGE: int = 31536000  # 1 year; uploaded files are never rewritten
+    MEDIA_ACCEL_REDIRECT_PREFIX: Optional[str] = None  # e.g. /_media/ to let nginx send the bytes
+    
+    # Observability
+    METRICS_ENABLED: bool = True  # Serve Prometheus metrics on /metrics
+    HEALTH_CHECK_TIMEOUT: float = 2.0  # Seconds /health waits for the database
     
     # Admin
     ADMIN_EMAIL: str = "admin@example.com"
     
+    # Outbound email. Contact messages are queued in the database and sent by a
+    # background sender over one reused SMTP connection; unset SMTP_HOST keeps
+    # them queued. Any SMTP server works, e.g. MailHog or aiosmtpd for development.
+    SMTP_HOST: Optional[str] = None
+    SMTP_PORT: int = 587
+    SMTP_USERNAME: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_STARTTLS: bool = True
+    SMTP_SSL: bool = False  # Implicit TLS (port 465) instead of STARTTLS
+    SMTP_FROM: str = "noreply@example.com"
+    SMTP_TIMEOUT: float = 10.0  # Seconds per SMTP command
+    SMTP_IDLE_SECONDS: int = 60  # An unused connection is closed after this long
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100  # Then the connection is renewed
+    OUTBOX_BATCH_SIZE: int = 20  # Messages claimed per send batch
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 5.0  # New messages also wake the sender at once
+    OUTBOX_MAX_ATTEMPTS: int = 8  # Then the message is dead-lettered
+    OUTBOX_RETRY_BASE_SECONDS: float = 30.0  # Backoff doubles per attempt, with jitter
+    OUTBOX_RETRY_MAX_SECONDS: float = 3600.0
+    OUTBOX_SENT_RETENTION_DAYS: int = 30  # Sent messages are pruned after this; dead ones are kept
+    
     # CORS
     CORS_ORIGINS: List[str] = [
         "http://localhost:5173", 
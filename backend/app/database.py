@@ -1,26 +1,123 @@
-from sqlalchemy import create_engine
+import asyncio
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import AsyncIterator, Optional
 from .config import settings
+from .geo import register_sqlite_functions
+
+
+def _async_url(url: str) -> str:
+    """Return the async driver variant of a database URL (aiosqlite / asyncpg)"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return str(parsed.set(drivername="sqlite+aiosqlite"))
+    if parsed.get_backend_name() == "postgresql":
+        return str(parsed.set(drivername="postgresql+asyncpg"))
+    return url
+
+
+def _async_pool_args(url: str) -> dict:
+    """Pool settings from config; in-memory SQLite keeps SQLAlchemy's default pool"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        # aiosqlite would otherwise default to NullPool and reconnect per session
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None) -> None:
+    """
+    Production SQLite profile: WAL lets readers proceed while a write is in
+    progress, synchronous=NORMAL only fsyncs at checkpoints (safe under WAL),
+    and busy_timeout makes writers wait instead of failing with
+    "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
+
+
+class SerializedWriter:
+    """
+    Funnels write transactions through one asyncio lock. SQLite allows a
+    single writer at a time; queueing writers in-process keeps them from
+    contending for the database lock, while WAL readers never wait on them.
+    Disabled (a no-op) for databases with row-level locking.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._lock: Optional[asyncio.Lock] = None
+
+    @asynccontextmanager
+    async def __call__(self) -> AsyncIterator[None]:
+        if not self.enabled:
+            yield
+            return
+        # Created lazily so the lock belongs to the running event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            yield
+
+
+IS_SQLITE = make_url(settings.DATABASE_URL).get_backend_name() == "sqlite"
 
 # Create engine
-connect_args = {"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+connect_args = {"check_same_thread": False} if IS_SQLITE else {}
+
+# Synchronous engine: migrations at startup and background worker threads
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args=connect_args
+    connect_args=connect_args,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+# Async engine used by request handlers, so DB waits don't block the event loop
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or _async_url(settings.DATABASE_URL),
+    connect_args=connect_args,
+    **_async_pool_args(settings.DATABASE_URL)
 )
 
+if IS_SQLITE:
+    event.listen(engine, "connect", register_sqlite_functions)
+    event.listen(async_engine.sync_engine, "connect", register_sqlite_functions)
+
+if IS_SQLITE and settings.SQLITE_TUNING:
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+
+# Use as `async with db_writer():` around write transactions
+db_writer = SerializedWriter(enabled=IS_SQLITE)
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Objects stay loaded after commit so responses can be serialized without lazy loads
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create Base class for models
 Base = declarative_base()
 
 
 # Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -1,33 +1,85 @@
-from fastapi import Depends, HTTPException, status, Cookie
-from sqlalchemy.orm import Session
+from dataclasses import dataclass
+from datetime import datetime
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
+from .cache import TTLCache
+from .config import settings
 from .database import get_db
 from .auth import verify_token
 from . import models
 
 
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """
+    The authenticated principal. A plain value rather than an ORM instance
+    so it can be shared across requests through the cache.
+    """
+    id: int
+    email: str
+    created_at: Optional[datetime] = None
+
+
+# Principals keyed by the token subject (email)
+_user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+
+def invalidate_cached_user(email: str) -> None:
+    """Drop a user's cached principal so the next request reloads it"""
+    _user_cache.pop(email)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _evict_changed_user(mapper, connection, target: models.User) -> None:
+    """Evict users whose row changed (e.g. password or email) or was deleted"""
+    history = inspect(target).attrs.email.history
+    for email in list(history.deleted or []) + [target.email]:
+        if email:
+            invalidate_cached_user(email)
+
+
 async def get_current_user(
-    access_token: Optional[str] = Cookie(None),
-    db: Session = Depends(get_db)
-) -> models.User:
+    request: Request,
+    token: Optional[str] = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> CurrentUser:
     """
-    Dependency to get the current authenticated user from JWT cookie
+    Dependency to get the current authenticated user from the Authorization
+    header or the JWT cookie. The user row is only loaded on a cache miss.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    if not access_token:
+
+    # Try to get token from cookie if not in header
+    if not token:
+        token = request.cookies.get("access_token")
+
+    if not token:
         raise credentials_exception
-    
-    email = verify_token(access_token)
+
+    email = verify_token(token)
     if email is None:
         raise credentials_exception
-    
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if user is None:
+
+    user = _user_cache.get(email)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    db_user = result.scalar_one_or_none()
+    if db_user is None:
         raise credentials_exception
-    
+
+    user = CurrentUser(id=db_user.id, email=db_user.email, created_at=db_user.created_at)
+    _user_cache.set(email, user)
     return user
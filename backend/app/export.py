@@ -0,0 +1,217 @@
+import csv
+import io
+import json
+import logging
+import time
+import zipfile
+from typing import AsyncIterator, List, Sequence
+
+from sqlalchemy import Select
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .database import AsyncSessionLocal
+from .storage import get_storage
+from . import models
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+
+EXPORT_COLUMNS = (
+    models.Report.id,
+    models.Report.created_at,
+    models.Report.media_type,
+    models.Report.media_path,
+    models.Report.thumbnail_path,
+    models.Report.description,
+    models.Report.behavior_rating,
+    models.Report.severity_index,
+    models.Report.latitude,
+    models.Report.longitude,
+    models.Report.device_info,
+    models.Report.camera_used,
+)
+COLUMN_NAMES = [column.key for column in EXPORT_COLUMNS]
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    return pyarrow is not None
+
+
+class _Sink:
+    """Unseekable write buffer that is drained into the response after each write"""
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class CsvEncoder:
+    def start(self) -> bytes:
+        return self.encode([COLUMN_NAMES], header=True)
+
+    def encode(self, rows: Sequence[Sequence], header: bool = False) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(row if header else [
+                value.isoformat() if hasattr(value, "isoformat") else value for value in row
+            ])
+        return buffer.getvalue().encode()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class NdjsonEncoder:
+    def start(self) -> bytes:
+        return b""
+
+    def encode(self, rows: Sequence[Sequence]) -> bytes:
+        return "".join(
+            json.dumps(dict(zip(COLUMN_NAMES, row)), default=lambda v: v.isoformat(), ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class ParquetEncoder:
+    """One Parquet row group per fetched batch, flushed as it is written"""
+
+    def __init__(self):
+        self.sink = _Sink()
+        self.schema = pyarrow.schema([
+            ("id", pyarrow.int64()),
+            ("created_at", pyarrow.timestamp("us")),
+            ("media_type", pyarrow.string()),
+            ("media_path", pyarrow.string()),
+            ("thumbnail_path", pyarrow.string()),
+            ("description", pyarrow.string()),
+            ("behavior_rating", pyarrow.int8()),
+            ("severity_index", pyarrow.int8()),
+            ("latitude", pyarrow.float64()),
+            ("longitude", pyarrow.float64()),
+            ("device_info", pyarrow.string()),
+            ("camera_used", pyarrow.string()),
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(self.sink, self.schema, compression="zstd")
+
+    def start(self) -> bytes:
+        return self.sink.drain()
+
+    def encode(self, rows: Sequence[Sequence]) -> bytes:
+        columns = list(zip(*rows))
+        self.writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+        return self.sink.drain()
+
+    def finish(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+ENCODERS = {"csv": CsvEncoder, "ndjson": NdjsonEncoder, "parquet": ParquetEncoder}
+
+
+def export_query(stmt: Select) -> Select:
+    """Narrow a report query to the exported columns, keeping its filters and order"""
+    return stmt.with_only_columns(*EXPORT_COLUMNS)
+
+
+async def _stream_rows(stmt: Select) -> AsyncIterator[Sequence[Sequence]]:
+    """
+    Yield batches of rows from a server-side cursor. The session is opened
+    here, not taken from the request, because the response body is produced
+    after the endpoint (and its dependencies) have returned.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield rows
+
+
+async def stream_export(stmt: Select, fmt: str) -> AsyncIterator[bytes]:
+    """Encode the rows of an export query, one batch at a time, in the threadpool"""
+    encoder = ENCODERS[fmt]()
+    yield encoder.start()
+    async for rows in _stream_rows(stmt):
+        chunk = await run_in_threadpool(encoder.encode, [row[:len(COLUMN_NAMES)] for row in rows])
+        if chunk:
+            yield chunk
+    yield encoder.finish()
+
+
+def _copy_block(f, entry) -> bool:
+    """Copy the next block of a file into a zip entry; False at the end of the file"""
+    block = f.read(settings.UPLOAD_CHUNK_SIZE)
+    entry.write(block)
+    return bool(block)
+
+
+async def stream_export_zip(stmt: Select, media_stmt: Select, fmt: str) -> AsyncIterator[bytes]:
+    """
+    Stream a zip holding reports.<fmt> followed by every referenced media file,
+    stored under its media_path. Entries use data descriptors, so nothing has
+    to be buffered to know sizes or checksums; media is stored uncompressed.
+    Compressing and checksumming run in the threadpool, off the event loop.
+    media_stmt must select distinct media paths.
+    """
+    sink = _Sink()
+    storage = get_storage()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(f"reports.{fmt}", "w", force_zip64=True) as entry:
+            async for chunk in stream_export(stmt, fmt):
+                await run_in_threadpool(entry.write, chunk)
+                yield sink.drain()
+
+        async for rows in _stream_rows(media_stmt):
+            for (media_path,) in rows:
+                copy = storage.local_copy(media_path)
+                try:
+                    local_path = await run_in_threadpool(copy.__enter__)
+                    f = await run_in_threadpool(open, local_path, "rb")
+                except Exception as e:
+                    logger.warning(f"Skipping {media_path} in export: {e}")
+                    continue
+                try:
+                    info = zipfile.ZipInfo(media_path, date_time=time.localtime()[:6])
+                    info.compress_type = zipfile.ZIP_STORED
+                    with archive.open(info, "w") as entry:
+                        while await run_in_threadpool(_copy_block, f, entry):
+                            yield sink.drain()
+                finally:
+                    f.close()
+                    await run_in_threadpool(copy.__exit__, None, None, None)
+    yield sink.drain()
@@ -0,0 +1,171 @@
+import math
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Float, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 12
+EARTH_RADIUS_M = 6371008.8
+WORLD_BBOX = (-90.0, -180.0, 90.0, 180.0)
+
+# Sorts after every geohash character, so [prefix, prefix + _UPPER) is the prefix range
+_UPPER = "{"
+
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode a coordinate as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Return (height in degrees latitude, width in degrees longitude) of a cell"""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def cell_count(bbox: Tuple[float, float, float, float], precision: int) -> int:
+    """Upper bound on the number of cells of a precision that a bounding box touches"""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    height, width = cell_size(precision)
+    rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+    cols = math.floor(max_lon / width) - math.floor(min_lon / width) + 1
+    return rows * cols
+
+
+def finest_precision(bbox: Tuple[float, float, float, float], max_cells: int, limit: int = GEOHASH_PRECISION) -> int:
+    """The finest precision, up to limit, at which bbox touches at most max_cells cells (at least 1)"""
+    precision = 1
+    for candidate in range(2, limit + 1):
+        if cell_count(bbox, candidate) > max_cells:
+            break
+        precision = candidate
+    return precision
+
+
+def covering_prefixes(
+    min_lat: float, min_lon: float, max_lat: float, max_lon: float, max_cells: int = 32
+) -> List[str]:
+    """
+    Return geohash prefixes whose cells together cover a bounding box, using
+    the finest precision that needs at most max_cells cells.
+    """
+    precision = finest_precision((min_lat, min_lon, max_lat, max_lon), max_cells)
+
+    height, width = cell_size(precision)
+    prefixes = set()
+    lat = math.floor(min_lat / height) * height
+    while lat <= max_lat:
+        lon = math.floor(min_lon / width) * width
+        while lon <= max_lon:
+            center_lat = min(max(lat + height / 2, -90.0), 90.0)
+            center_lon = min(max(lon + width / 2, -180.0), 180.0)
+            prefixes.add(encode_geohash(center_lat, center_lon, precision))
+            lon += width
+        lat += height
+    return sorted(prefixes)
+
+
+def prefix_range(prefix: str) -> Tuple[str, str]:
+    """Return the [low, high) string range matching every geohash with this prefix"""
+    return prefix, prefix + _UPPER
+
+
+def radius_bbox(latitude: float, longitude: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """
+    Return (min_lat, min_lon, max_lat, max_lon) enclosing a circle; raises
+    ValueError if the circle crosses the antimeridian, as a bounding box
+    there would need two longitude ranges
+    """
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    min_lat, max_lat = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    if min_lat == -90.0 or max_lat == 90.0:
+        # A circle around a pole spans every longitude
+        return min_lat, -180.0, max_lat, 180.0
+    dlon = math.degrees(radius_m / (EARTH_RADIUS_M * math.cos(math.radians(latitude))))
+    if dlon >= 180.0:
+        return min_lat, -180.0, max_lat, 180.0
+    if longitude - dlon < -180.0 or longitude + dlon > 180.0:
+        raise ValueError("Radius searches must not cross the antimeridian")
+    return min_lat, longitude - dlon, max_lat, longitude + dlon
+
+
+def precision_for_zoom(zoom: int) -> int:
+    """Geohash precision whose cells roughly match a web map tile at this zoom"""
+    return max(1, min(GEOHASH_PRECISION, (zoom * 2 + 4) // 5))
+
+
+def cluster_precision(zoom: int, bbox: Optional[Tuple[float, float, float, float]], max_cells: int) -> int:
+    """
+    Precision for map clusters at a zoom level over bbox (the whole world if
+    None), coarsened until the area holds at most max_cells cells
+    """
+    return finest_precision(bbox or WORLD_BBOX, max_cells, precision_for_zoom(zoom))
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in meters"""
+    if None in (lat1, lon1, lat2, lon2):
+        return None
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def register_sqlite_functions(dbapi_connection, connection_record=None) -> None:
+    """Expose haversine_m() to SQLite, which has no trigonometric functions by default"""
+    dbapi_connection.create_function("haversine_m", 4, haversine_m, deterministic=True)
+
+
+class distance_m(FunctionElement):
+    """
+    SQL great-circle distance in meters between two coordinates.
+    Compiles to the registered haversine_m() on SQLite and to a plain
+    trigonometric expression elsewhere.
+    """
+    type = Float()
+    inherit_cache = True
+    name = "distance_m"
+
+
+@compiles(distance_m, "sqlite")
+def _distance_m_sqlite(element, compiler, **kw):
+    return "haversine_m(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(distance_m)
+def _distance_m_default(element, compiler, **kw):
+    lat1, lon1, lat2, lon2 = element.clauses.clauses
+    a = (
+        func.power(func.sin(func.radians(lat2 - lat1) / 2), 2)
+        + func.cos(func.radians(lat1)) * func.cos(func.radians(lat2))
+        * func.power(func.sin(func.radians(lon2 - lon1) / 2), 2)
+    )
+    expr = 2 * EARTH_RADIUS_M * func.asin(func.sqrt(func.least(1.0, a)))
+    return compiler.process(expr, **kw)
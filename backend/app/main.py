@@ -1,15 +1,24 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from pathlib import Path
+from typing import List
+import asyncio
+import logging
 import os
+from sqlalchemy import text
 from .config import settings
-from .database import engine, Base
-from .routers import auth, reports, contact
+from .database import engine, async_engine
+from .migrations import run_migrations
+from .routers import auth, reports, contact, media
+from .admission import AdmissionMiddleware
+from .auth import password_hasher
+from . import media_gc, metrics, outbox, resumable, thumbnails
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+# Create database tables and apply pending schema changes
+run_migrations(engine)
 
 # Create FastAPI app
 app = FastAPI(
@@ -18,6 +27,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Admission control, innermost so refusals still get CORS headers and metrics
+app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -25,17 +37,57 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Content-Range", "Accept-Ranges", "ETag", "Location", "Upload-Offset", "Upload-Length"],
 )
 
-# Mount static files for media uploads
+# Request latency per route template, DB timings and pool usage for /metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument_engine(engine, "sync")
+    metrics.instrument_engine(async_engine.sync_engine, "async")
+    metrics.PASSWORD_HASH_PENDING.set_function(lambda: password_hasher.pending)
+
+# Media uploads are served by the media router (Range, ETag, immutable caching)
 upload_dir = Path(settings.UPLOAD_DIR)
 upload_dir.mkdir(parents=True, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(reports.router)
 app.include_router(contact.router)
+app.include_router(media.router)
+
+
+# Periodic maintenance loops, cancelled on shutdown
+background_tasks: List[asyncio.Task] = []
+
+
+@app.on_event("startup")
+async def start_background_workers():
+    """
+    Start the thumbnail worker pool, resume unfinished jobs and start
+    periodic maintenance
+    """
+    thumbnails.start_worker_pool()
+    await thumbnails.requeue_pending_thumbnails()
+    background_tasks.append(asyncio.create_task(resumable.run_session_gc()))
+    background_tasks.append(asyncio.create_task(media_gc.run_media_reaper()))
+    background_tasks.append(asyncio.create_task(media_gc.run_storage_reconciliation()))
+    background_tasks.append(asyncio.create_task(outbox.run_outbox_sender()))
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    """
+    Stop background work and close pooled DB connections
+    """
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    thumbnails.shutdown_worker_pool()
+    password_hasher.shutdown()
+    await async_engine.dispose()
 
 
 @app.get("/")
@@ -50,12 +102,35 @@ async def root():
     }
 
 
+async def _ping_database() -> None:
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
 @app.get("/health")
 async def health_check():
     """
-    Health check endpoint
+    Readiness check: healthy only when the database answers
+    """
+    try:
+        await asyncio.wait_for(_ping_database(), timeout=settings.HEALTH_CHECK_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Health check failed: {e!r}")
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable", "database": "unreachable"},
+        )
+    return {"status": "healthy", "database": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Prometheus scrape endpoint
     """
-    return {"status": "healthy"}
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    return Response(metrics.render(), headers={"Content-Type": metrics.CONTENT_TYPE_LATEST})
 
 
 if __name__ == "__main__":
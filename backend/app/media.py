@@ -0,0 +1,327 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
+from jose import JWTError, jwt
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .metrics import UPLOAD_BYTES, UPLOAD_DURATION
+from .storage import get_storage
+from . import models, thumbnails
+
+logger = logging.getLogger(__name__)
+
+_EXTENSION = re.compile(r"\.[a-z0-9]{1,10}")
+
+# ref_count of a tombstone the media reaper has claimed (see media_gc)
+REAPING = -1
+
+# Paths whose files the reaper is deleting right now, outside db_writer. An
+# upload reviving one waits for the delete before placing its own copy.
+_reaping: Dict[str, asyncio.Event] = {}
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds its size limit while being ingested"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"Upload exceeds {max_size} bytes")
+        self.max_size = max_size
+
+
+class InvalidUploadError(Exception):
+    """Raised when a direct upload cannot be finalized"""
+
+
+@dataclass
+class StoredMedia:
+    """
+    A hashed upload waiting to be placed at its content-addressed key: either
+    in a local temp file (proxied uploads) or already in storage (direct uploads)
+    """
+    path: str  # Content-addressed storage key, with forward slashes
+    sha256: str
+    size: int
+    temp_path: Optional[str] = None
+
+
+def content_path(upload_dir: str, digest: str, extension: str) -> str:
+    """Shard files by hash prefix: UPLOAD_DIR/ab/cd/abcd...<ext>"""
+    return Path(upload_dir, digest[:2], digest[2:4], f"{digest}{extension}").as_posix()
+
+
+def safe_extension(filename: Optional[str]) -> str:
+    """Lower-cased extension of a client-supplied filename, or "" if unusual"""
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if _EXTENSION.fullmatch(extension) else ""
+
+
+async def ingest_stream(
+    chunks: AsyncIterator[bytes],
+    upload_dir: str,
+    extension: str,
+    max_size: int,
+) -> StoredMedia:
+    """
+    Write a stream of byte blocks into a temp file in upload_dir, hashing it
+    on the way.
+
+    The size limit is enforced on every block and the temp file is fsynced.
+    Only one block is held in memory at a time. The file is moved to its
+    content-addressed path by acquire_blob (or place_upload); call
+    discard_upload afterwards to clean up whatever was not placed.
+    """
+    Path(upload_dir).mkdir(parents=True, exist_ok=True)
+    temp_path = os.path.join(upload_dir, f".{uuid.uuid4()}{extension}.part")
+
+    digest = hashlib.sha256()
+    written = 0
+    started = time.perf_counter()
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > max_size:
+                    raise UploadTooLargeError(max_size)
+                digest.update(chunk)
+                await buffer.write(chunk)
+            await buffer.flush()
+            await run_in_threadpool(os.fsync, buffer.fileno())
+    except BaseException:
+        try:
+            await aiofiles.os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        UPLOAD_BYTES.labels("single").inc(written)
+
+    UPLOAD_DURATION.labels("single").observe(time.perf_counter() - started)
+    return StoredMedia(
+        path=content_path(upload_dir, digest.hexdigest(), extension),
+        sha256=digest.hexdigest(),
+        size=written,
+        temp_path=temp_path,
+    )
+
+
+async def ingest_upload(
+    upload_file: UploadFile,
+    upload_dir: str,
+    max_size: int,
+    chunk_size: Optional[int] = None,
+) -> StoredMedia:
+    """Stream a multipart upload to a temp file with ingest_stream"""
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    async def blocks():
+        while True:
+            chunk = await upload_file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    return await ingest_stream(blocks(), upload_dir, safe_extension(upload_file.filename), max_size)
+
+
+def media_type_for(content_type: str) -> str:
+    """Classify an upload the way create_report always has"""
+    return "image" if content_type.startswith("image/") else "video"
+
+
+def create_upload_ticket(user_id: int, media: StoredMedia, media_type: str, expires_in: int) -> str:
+    """Sign the details of a direct upload so finalize can trust them"""
+    claims = {
+        "typ": "upload",
+        "uid": user_id,
+        "key": media.path,
+        "sha256": media.sha256,
+        "size": media.size,
+        "media_type": media_type,
+        # Finalize may come a little after the PUT URL has expired
+        "exp": datetime.utcnow() + timedelta(seconds=expires_in * 2),
+    }
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def read_upload_ticket(token: str, user_id: int) -> Tuple[StoredMedia, str]:
+    """Return (media, media_type) for a ticket issued to user_id"""
+    try:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise InvalidUploadError("Invalid or expired upload token")
+    if claims.get("typ") != "upload" or claims.get("uid") != user_id:
+        raise InvalidUploadError("Invalid or expired upload token")
+    media = StoredMedia(path=claims["key"], sha256=claims["sha256"], size=claims["size"])
+    return media, claims["media_type"]
+
+
+def _place_file(media: StoredMedia) -> None:
+    storage = get_storage()
+    if media.temp_path is None:
+        # Direct upload: the client already put the bytes at the key
+        if storage.size(media.path) != media.size:
+            raise InvalidUploadError("Upload not found or incomplete")
+        return
+    if storage.exists(media.path):
+        # Identical bytes are already stored
+        os.remove(media.temp_path)
+        return
+    storage.save(media.temp_path, media.path, mimetypes.guess_type(media.path)[0])
+
+
+async def acquire_blob(db: AsyncSession, media: StoredMedia) -> int:
+    """
+    Take a reference on the blob for an ingested upload, inside the caller's
+    transaction, and make sure its file is in place. The reference is taken
+    first so a concurrent release of the last reference (which holds the row
+    until it commits) cannot unlink the file after it has been placed.
+    Returns the new reference count; raises InvalidUploadError when a direct
+    upload is missing from storage.
+    """
+    table = models.MediaBlob.__table__
+    dialect = db.get_bind().dialect.name
+    # A tombstone claimed by the reaper has no references either
+    incremented = case((table.c.ref_count < 0, 1), else_=table.c.ref_count + 1)
+
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = dialect_insert(table).values(path=media.path, sha256=media.sha256, size=media.size, ref_count=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["path"],
+            set_={"ref_count": incremented, "released_at": None},
+        ).returning(table.c.ref_count)
+        ref_count = (await db.execute(stmt)).scalar_one()
+    else:
+        result = await db.execute(
+            update(table).where(table.c.path == media.path)
+            .values(ref_count=incremented, released_at=None)
+        )
+        if result.rowcount == 0:
+            await db.execute(insert(table).values(
+                path=media.path, sha256=media.sha256, size=media.size, ref_count=1
+            ))
+        ref_count = (await db.execute(select(table.c.ref_count).where(table.c.path == media.path))).scalar_one()
+
+    reaping = _reaping.get(media.path)
+    if reaping is not None:
+        # Revived a claimed tombstone: let the reaper finish deleting the file
+        await reaping.wait()
+    await run_in_threadpool(_place_file, media)
+    return ref_count
+
+
+async def place_upload(media: StoredMedia) -> None:
+    """Move an ingested file to its key without taking a reference (direct uploads)"""
+    await run_in_threadpool(_place_file, media)
+
+
+async def discard_upload(media: StoredMedia) -> None:
+    """Remove the temp file of an upload that was not placed"""
+    if media.temp_path is None:
+        return
+    try:
+        await aiofiles.os.remove(media.temp_path)
+    except OSError:
+        pass
+
+
+async def release_blob(db: AsyncSession, path: str) -> int:
+    """
+    Drop one reference to a media file, inside the caller's transaction, and
+    return how many remain. Releasing the last reference leaves the row as a
+    tombstone for the media reaper (see media_gc) instead of deleting files
+    in the request. Files stored before deduplication have no blob row and
+    count as having a single owner; a tombstone row is created for them.
+    """
+    table = models.MediaBlob.__table__
+    result = await db.execute(
+        update(table).where(table.c.path == path)
+        .values(ref_count=table.c.ref_count - 1)
+        .returning(table.c.ref_count)
+    )
+    remaining = result.scalar_one_or_none()
+    if remaining is None:
+        await db.execute(insert(table).values(
+            path=path, sha256=tombstone_digest(path), size=0, ref_count=0, released_at=datetime.utcnow()
+        ))
+        return 0
+    if remaining <= 0:
+        await db.execute(
+            update(table).where(table.c.path == path).values(ref_count=0, released_at=datetime.utcnow())
+        )
+        return 0
+    return remaining
+
+
+async def tombstone_media(db: AsyncSession, path: str) -> None:
+    """
+    Queue the files of media no report references for the reaper again, inside
+    the caller's transaction: e.g. renditions rendered after the last
+    reference was released, possibly after the reaper already ran. Creates
+    the tombstone if the row is gone; media still referenced is left alone.
+    """
+    table = models.MediaBlob.__table__
+    now = datetime.utcnow()
+    released = await db.execute(
+        update(table).where(table.c.path == path, table.c.ref_count <= 0).values(ref_count=0, released_at=now)
+    )
+    if released.rowcount == 0 and (await db.execute(select(table.c.path).where(table.c.path == path))).first() is None:
+        await db.execute(insert(table).values(
+            path=path, sha256=tombstone_digest(path), size=0, ref_count=0, released_at=now
+        ))
+
+
+def begin_reaping(path: str) -> bool:
+    """
+    Record that the reaper is deleting path's files; False if it already is.
+    Call holding db_writer, in the transaction claiming the tombstone.
+    """
+    if path in _reaping:
+        return False
+    _reaping[path] = asyncio.Event()
+    return True
+
+
+def end_reaping(path: str) -> None:
+    """Let uploads waiting for path's files to be deleted continue"""
+    reaping = _reaping.pop(path, None)
+    if reaping is not None:
+        reaping.set()
+
+
+def tombstone_digest(path: str) -> str:
+    """sha256 column of a tombstone for a file without a blob row (its name, for content paths)"""
+    return os.path.splitext(os.path.basename(path))[0][:64]
+
+
+def remove_media_files(media_path: str) -> int:
+    """
+    Delete a media file and its derivatives and return the bytes freed.
+    Files already gone are skipped; storage errors are raised.
+    """
+    storage = get_storage()
+    freed = 0
+    for path in [media_path] + thumbnails.rendition_paths(media_path):
+        size = storage.size(path)
+        if size is None:
+            continue
+        storage.delete(path)
+        freed += size
+    return freed
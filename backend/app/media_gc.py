@@ -0,0 +1,291 @@
+import asyncio
+import itertools
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .database import AsyncSessionLocal, db_writer, engine
+from .media import REAPING, begin_reaping, end_reaping, remove_media_files, tombstone_digest
+from .metrics import STORAGE_RECLAIMED_BYTES
+from .storage import get_storage
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# Media files are never deleted inside a request. Releasing the last
+# reference to a file leaves its media_blobs row as a tombstone (ref_count 0,
+# released_at set) and the reaper deletes the file and its derivatives in
+# the background, without holding the writer lock while storage works. A
+# new upload of the same bytes revives the row, also while it is being
+# reaped. Waiting for an in-flight delete is in-process, like db_writer:
+# run a single process per database.
+#
+# Reconciliation catches what never got a tombstone: objects in UPLOAD_DIR
+# that no blob row or report owns (a crash between placing a file and
+# committing, direct uploads that were never finalized, thumbnails rendered
+# after their report was deleted) and temp files left by interrupted uploads.
+# Only files older than ORPHAN_GRACE_SECONDS are touched, so uploads still
+# in flight are safe. Orphaned objects are tombstoned and left to the reaper,
+# which keeps a single code path deleting media.
+
+_BLOBS = models.MediaBlob.__table__
+_TEMP_SUFFIXES = (".part", ".upload")
+_CHECK_BATCH_SIZE = 200
+
+
+@dataclass
+class ReconcileReport:
+    """What a reconciliation pass found and reclaimed"""
+    orphaned_files: int = 0
+    orphaned_bytes: int = 0
+    temp_files: int = 0
+    temp_bytes: int = 0
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        return self.orphaned_bytes + self.temp_bytes
+
+
+async def _reap(db, path: str) -> Optional[int]:
+    """Delete a tombstoned file and its row; return the bytes freed, or None if it was revived"""
+    # Claim under the writer lock, delete with no lock held, then drop the
+    # row unless an upload revived it meanwhile (the upload waits for the
+    # delete and places its own copy)
+    async with db_writer():
+        if not begin_reaping(path):
+            return None  # Another pass is deleting it
+        try:
+            claimed = (await db.execute(
+                update(_BLOBS).where(_BLOBS.c.path == path, _BLOBS.c.ref_count <= 0).values(ref_count=REAPING)
+            )).rowcount
+            await db.commit()
+        except BaseException:
+            end_reaping(path)
+            raise
+    try:
+        if not claimed:
+            return None  # Re-acquired by an upload
+        freed = await run_in_threadpool(remove_media_files, path)
+    finally:
+        end_reaping(path)
+    async with db_writer():
+        await db.execute(delete(_BLOBS).where(_BLOBS.c.path == path, _BLOBS.c.ref_count == REAPING))
+        await db.commit()
+    return freed
+
+
+async def _defer(db, path: str) -> None:
+    """Move a tombstone to the back of the queue after a failed delete"""
+    async with db_writer():
+        await db.execute(
+            update(_BLOBS).where(_BLOBS.c.path == path, _BLOBS.c.ref_count <= 0)
+            .values(ref_count=0, released_at=datetime.utcnow())
+        )
+        await db.commit()
+
+
+async def reap_released_media(batch_size: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Delete the files of up to batch_size tombstoned blobs, oldest first.
+    Returns (tombstones cleared, bytes freed); a file that cannot be deleted
+    keeps its tombstone and is retried after the rest of the queue.
+    """
+    batch_size = batch_size or settings.MEDIA_REAPER_BATCH_SIZE
+    cleared = freed = 0
+    async with AsyncSessionLocal() as db:
+        paths = (await db.execute(
+            select(_BLOBS.c.path)
+            .where(_BLOBS.c.ref_count <= 0, _BLOBS.c.released_at.is_not(None))
+            .order_by(_BLOBS.c.released_at)
+            .limit(batch_size)
+        )).scalars().all()
+        for path in paths:
+            try:
+                freed += await _reap(db, path) or 0
+                cleared += 1
+            except Exception as e:
+                logger.warning(f"Could not remove {path}, keeping its tombstone: {e}")
+                await _defer(db, path)
+    if freed:
+        STORAGE_RECLAIMED_BYTES.labels("media").inc(freed)
+    if cleared:
+        logger.info(f"Reaped {cleared} released media files ({freed} bytes)")
+    return cleared, freed
+
+
+async def _drain() -> None:
+    """Reap full batches until the queue is empty"""
+    while (await reap_released_media())[0] >= settings.MEDIA_REAPER_BATCH_SIZE:
+        pass
+
+
+async def run_media_reaper() -> None:
+    """Background loop draining media tombstones until cancelled"""
+    while True:
+        try:
+            await _drain()
+        except Exception as e:
+            logger.error(f"Media reaper failed: {e}")
+        await asyncio.sleep(settings.MEDIA_REAPER_INTERVAL_SECONDS)
+
+
+def _owner_stem(key: str) -> str:
+    """Media path without extension that a stored object belongs to (itself for media files)"""
+    directory, _, name = key.rpartition("/")
+    if name.startswith("thumb_"):
+        name = name[len("thumb_"):]
+    stem = os.path.splitext(name)[0]
+    for rendition in settings.IMAGE_RENDITIONS:
+        if stem.endswith(f"_{rendition}"):
+            stem = stem[:-len(rendition) - 1]
+            break
+    return f"{directory}/{stem}" if directory else stem
+
+
+async def _legacy_stems(db) -> Set[str]:
+    """Media of reports stored before deduplication, which have no blob row"""
+    report = models.Report
+    rows = (await db.execute(
+        select(report.media_path)
+        .outerjoin(_BLOBS, _BLOBS.c.path == report.media_path)
+        .where(_BLOBS.c.path.is_(None))
+    )).scalars()
+    return {os.path.splitext(Path(path).as_posix())[0] for path in rows}
+
+
+async def _blob_stems(db, stems: Set[str]) -> Set[str]:
+    """Those of stems that have a blob row, live or tombstoned, under any extension"""
+    path = _BLOBS.c.path
+    # "<stem>." <= path < "<stem>/" selects "<stem>.<ext>" with a range scan of the key
+    conditions = [or_(path == stem, and_(path >= f"{stem}.", path < f"{stem}/")) for stem in stems]
+    rows = (await db.execute(select(path).where(or_(*conditions)))).scalars()
+    return {os.path.splitext(p)[0] for p in rows}
+
+
+async def _tombstone(db, key: str, size: int) -> None:
+    """Hand an orphaned object to the reaper"""
+    values = dict(
+        path=key, sha256=tombstone_digest(key), size=size, ref_count=0, released_at=datetime.utcnow()
+    )
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        await db.execute(dialect_insert(_BLOBS).values(**values).on_conflict_do_nothing(index_elements=["path"]))
+    elif (await db.execute(select(_BLOBS.c.path).where(_BLOBS.c.path == key))).first() is None:
+        await db.execute(insert(_BLOBS).values(**values))
+
+
+def _old_objects(cutoff: float) -> Iterator[Tuple[str, int]]:
+    """Stored objects under UPLOAD_DIR last modified before cutoff, temp files excluded"""
+    prefix = Path(settings.UPLOAD_DIR).as_posix() + "/"
+    for key, size, modified in get_storage().iter_objects(prefix):
+        if modified < cutoff and not key.rpartition("/")[2].startswith("."):
+            yield key, size
+
+
+def _next_batch(objects: Iterator[Tuple[str, int]]) -> List[Tuple[str, int]]:
+    return list(itertools.islice(objects, _CHECK_BATCH_SIZE))
+
+
+async def _tombstone_orphans(cutoff: float, report: ReconcileReport) -> None:
+    async with AsyncSessionLocal() as db:
+        # Only shrinks (new reports always get a blob row), so it may be read once
+        legacy = await _legacy_stems(db)
+        await db.rollback()
+
+        objects = _old_objects(cutoff)
+        # Listing storage blocks, so it runs in the threadpool one batch at a time
+        while batch := await run_in_threadpool(_next_batch, objects):
+            owners = {key: _owner_stem(key) for key, _ in batch}
+            # Checked and tombstoned under the writer lock, so no upload can
+            # take a reference between the check and the insert
+            async with db_writer():
+                live = legacy | await _blob_stems(db, set(owners.values()) - legacy)
+                for key, size in batch:
+                    if owners[key] not in live:
+                        await _tombstone(db, key, size)
+                        report.orphaned_files += 1
+                        report.orphaned_bytes += size
+                await db.commit()
+
+
+def _remove_stale_temp_files(cutoff: float, report: ReconcileReport) -> None:
+    """Remove .part files of interrupted uploads and .upload files of sessions that are gone"""
+    candidates = []
+    for root, _, files in os.walk(settings.UPLOAD_DIR):
+        for name in files:
+            if not (name.startswith(".") and name.endswith(_TEMP_SUFFIXES)):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime < cutoff:
+                candidates.append((path, name, stat.st_size))
+
+    session_ids = {name[1:-len(".upload")] for _, name, _ in candidates if name.endswith(".upload")}
+    if session_ids:
+        with engine.connect() as conn:
+            active = set(conn.execute(
+                select(models.UploadSession.id).where(models.UploadSession.id.in_(session_ids))
+            ).scalars())
+    else:
+        active = set()
+
+    for path, name, size in candidates:
+        if name.endswith(".upload") and name[1:-len(".upload")] in active:
+            continue  # Still a live session; the session GC owns it
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            logger.warning(f"Could not remove temp file {path}: {e}")
+            continue
+        report.temp_files += 1
+        report.temp_bytes += size
+    STORAGE_RECLAIMED_BYTES.labels("temp").inc(report.temp_bytes)
+
+
+async def reconcile_storage(grace_seconds: Optional[int] = None) -> ReconcileReport:
+    """
+    Scan UPLOAD_DIR against the database: tombstone orphaned objects older
+    than the grace period, remove stale temp files, then reap the tombstones
+    so the reported bytes are actually freed
+    """
+    if grace_seconds is None:
+        grace_seconds = settings.ORPHAN_GRACE_SECONDS
+    started = time.perf_counter()
+    cutoff = time.time() - grace_seconds
+    report = ReconcileReport()
+    await run_in_threadpool(_remove_stale_temp_files, cutoff, report)
+    await _tombstone_orphans(cutoff, report)
+    if report.orphaned_files:
+        await _drain()
+    logger.info(
+        f"Storage reconciliation reclaimed {report.reclaimed_bytes} bytes: "
+        f"{report.orphaned_files} orphaned files ({report.orphaned_bytes} bytes), "
+        f"{report.temp_files} stale temp files ({report.temp_bytes} bytes) "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    return report
+
+
+async def run_storage_reconciliation() -> None:
+    """Background loop reconciling storage with the database until cancelled"""
+    while True:
+        try:
+            await reconcile_storage()
+        except Exception as e:
+            logger.error(f"Storage reconciliation failed: {e}")
+        await asyncio.sleep(settings.ORPHAN_SCAN_INTERVAL_SECONDS)
@@ -0,0 +1,178 @@
+import time
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Prometheus metrics for this process. Recording is a dict lookup and a few
+# float additions, cheap enough to leave on in production; the text
+# exposition is only built when /metrics is scraped.
+
+registry = CollectorRegistry(auto_describe=True)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to send the full response, by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    registry=registry,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests currently being handled", registry=registry
+)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Statement execution time, by engine and statement kind",
+    ["engine", "statement"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+    registry=registry,
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Connections in the pool, by state (checked_out, idle, overflow, size)",
+    ["engine", "state"],
+    registry=registry,
+)
+
+UPLOAD_BYTES = Counter(
+    "upload_bytes", "Media bytes received, by upload kind", ["kind"], registry=registry
+)
+UPLOAD_DURATION = Histogram(
+    "upload_duration_seconds",
+    "Time to receive and store an upload body, by upload kind",
+    ["kind"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+    registry=registry,
+)
+
+THUMBNAIL_DURATION = Histogram(
+    "thumbnail_job_duration_seconds",
+    "Time from queueing a rendition job to its result, by outcome",
+    ["status"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+    registry=registry,
+)
+
+PAGE_CACHE_REQUESTS = Counter(
+    "report_page_cache_requests",
+    "Report list/detail requests by cache outcome (not_modified, hit, miss)",
+    ["result"],
+    registry=registry,
+)
+
+ADMISSION_ACTIVE = Gauge(
+    "admission_active_requests", "Requests holding a slot, by route class", ["route_class"], registry=registry
+)
+ADMISSION_WAITING = Gauge(
+    "admission_waiting_requests", "Requests queued for a slot, by route class", ["route_class"], registry=registry
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_requests",
+    "Requests refused by admission control, by route class and reason",
+    ["route_class", "reason"],
+    registry=registry,
+)
+
+STORAGE_RECLAIMED_BYTES = Counter(
+    "storage_reclaimed_bytes",
+    "Bytes freed by media garbage collection, by source (media tombstones, temp files)",
+    ["source"],
+    registry=registry,
+)
+
+OUTBOX_EMAILS = Counter(
+    "outbox_emails",
+    "Outbound email delivery attempts by result (sent, retried, dead)",
+    ["result"],
+    registry=registry,
+)
+SMTP_CONNECTIONS = Counter(
+    "smtp_connections_opened", "SMTP connections opened by the outbox sender", registry=registry
+)
+
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending", "Password operations running or queued", registry=registry
+)
+
+_STATEMENT_KINDS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+def render() -> bytes:
+    """The registry in the Prometheus text format"""
+    return generate_latest(registry)
+
+
+def _statement_kind(statement: str) -> str:
+    kind = statement.lstrip()[:6].upper()
+    return kind if kind in _STATEMENT_KINDS else "OTHER"
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Time every statement run on a (sync) engine and expose its pool usage"""
+    histograms = {
+        kind: DB_QUERY_DURATION.labels(name, kind) for kind in _STATEMENT_KINDS + ("OTHER",)
+    }
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        histograms[_statement_kind(statement)].observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    pool = engine.pool
+    # Only queue pools report usage; SQLite in-memory pools and NullPool do not
+    if hasattr(pool, "checkedout"):
+        DB_POOL_CONNECTIONS.labels(name, "checked_out").set_function(pool.checkedout)
+        DB_POOL_CONNECTIONS.labels(name, "idle").set_function(pool.checkedin)
+        DB_POOL_CONNECTIONS.labels(name, "overflow").set_function(lambda: max(pool.overflow(), 0))
+        DB_POOL_CONNECTIONS.labels(name, "size").set_function(pool.size)
+
+
+class MetricsMiddleware:
+    """
+    Records one latency observation per HTTP request, labelled with the
+    matched route template (e.g. /reports/{report_id}) rather than the raw
+    path, so label cardinality stays bounded. Plain ASGI, so streaming
+    responses are timed to their last byte without being buffered.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code: Optional[int] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code or 500),
+            ).observe(time.perf_counter() - started)
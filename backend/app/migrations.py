@@ -0,0 +1,95 @@
+import logging
+from typing import Set
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.engine import Engine
+from .database import Base
+from . import models
+from .geo import encode_geohash
+from .search import install_search
+from .stats import rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+
+def _add_missing_columns(conn) -> Set[str]:
+    """
+    Add nullable columns that exist on the models but not yet in the database.
+    create_all only creates missing tables, so databases created by an older
+    version of the app need their new columns added in place.
+    Returns the added columns as "table.column".
+    """
+    added = set()
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            logger.info(f"Adding column {table.name}.{column.name}")
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            added.add(f"{table.name}.{column.name}")
+    return added
+
+
+def _create_missing_indexes(conn) -> None:
+    """
+    Create model indexes missing from existing tables (CREATE INDEX is only
+    issued by create_all for tables it creates itself).
+    """
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                logger.info(f"Creating index {index.name}")
+                index.create(conn)
+
+
+def _backfill_report_stats(conn) -> None:
+    """Populate the statistics rollup for reports created before it existed"""
+    has_stats = conn.execute(select(models.ReportDailyStat.user_id).limit(1)).first()
+    has_reports = conn.execute(select(models.Report.id).limit(1)).first()
+    if has_reports and not has_stats:
+        logger.info("Backfilling report_daily_stats from reports")
+        rebuild_rollups(conn)
+
+
+def _backfill_geohashes(conn, batch_size: int = 1000) -> None:
+    """Compute geohashes for geotagged reports stored before the column existed"""
+    report = models.Report
+    while True:
+        rows = conn.execute(
+            select(report.id, report.latitude, report.longitude).where(
+                report.geohash.is_(None),
+                report.latitude.is_not(None),
+                report.longitude.is_not(None),
+            ).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        logger.info(f"Backfilling geohash for {len(rows)} reports")
+        for report_id, latitude, longitude in rows:
+            conn.execute(
+                update(report).where(report.id == report_id)
+                .values(geohash=encode_geohash(latitude, longitude))
+            )
+
+
+def run_migrations(engine: Engine) -> None:
+    """
+    Create missing tables and bring existing SQLite/PostgreSQL databases up to
+    date with the models. Every step is idempotent.
+    """
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        added_columns = _add_missing_columns(conn)
+        _create_missing_indexes(conn)
+        _backfill_report_stats(conn)
+        install_search(conn)
+        if "reports.geohash" in added_columns:
+            _backfill_geohashes(conn)
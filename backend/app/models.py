@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -14,6 +14,7 @@ class User(Base):
     
     # Relationship
     reports = relationship("Report", back_populates="user", cascade="all, delete-orphan")
+    report_stats = relationship("ReportDailyStat", cascade="all, delete-orphan")
 
 
 class Report(Base):
@@ -26,6 +27,8 @@ class Report(Base):
     media_type = Column(String, nullable=False)  # 'image' or 'video'
     media_path = Column(String, nullable=False)
     thumbnail_path = Column(String, nullable=True)
+    thumbnail_status = Column(String, nullable=True)  # 'pending', 'ready' or 'failed'
+    renditions = Column(JSON, nullable=True)  # [{name, width, height, format, path}]
     
     # Report content
     description = Column(Text, nullable=False)  # Max 150 words
@@ -35,9 +38,100 @@ class Report(Base):
     # Metadata
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    geohash = Column(String(12), nullable=True)  # Derived from latitude/longitude for spatial lookups
     device_info = Column(String, nullable=True)
     camera_used = Column(String, nullable=True)  # 'front', 'environment', or 'upload'
+    idempotency_key = Column(String(64), nullable=True)  # Client-chosen, unique per user (batch uploads)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     # Relationship
     user = relationship("User", back_populates="reports")
+    
+    # Composite indexes matching the list_reports filter/sort shapes
+    __table_args__ = (
+        Index("ix_reports_user_created_at", "user_id", "created_at", "id"),
+        Index("ix_reports_user_behavior_rating", "user_id", "behavior_rating", "id"),
+        Index("ix_reports_user_severity_index", "user_id", "severity_index", "id"),
+        Index("ix_reports_user_id_id", "user_id", "id"),
+        Index("ix_reports_user_geohash", "user_id", "geohash"),
+        Index("ix_reports_user_idempotency_key", "user_id", "idempotency_key", unique=True),
+    )
+
+
+class ReportDailyStat(Base):
+    """
+    Rollup of report counts per user, day, rating and severity bucket.
+    Maintained incrementally by create_report/delete_report so statistics
+    never scan the reports table.
+    """
+    __tablename__ = "report_daily_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    behavior_rating = Column(Integer, primary_key=True)  # 1-5 stars
+    severity_bucket = Column(Integer, primary_key=True)  # 0-9, i.e. severity_index // 10 (100 -> 9)
+    report_count = Column(Integer, nullable=False, default=0)
+
+
+class MediaBlob(Base):
+    """
+    A content-addressed media file, stored once under its SHA-256 and shared
+    by every report that uploaded the same bytes. When ref_count drops to
+    zero the row stays as a tombstone (released_at set) until the media
+    reaper has deleted the file and its derivatives.
+    """
+    __tablename__ = "media_blobs"
+    
+    path = Column(String, primary_key=True)  # UPLOAD_DIR/ab/cd/<sha256><ext>
+    sha256 = Column(String(64), nullable=False)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)  # -1 while the reaper deletes the file
+    created_at = Column(DateTime, default=datetime.utcnow)
+    released_at = Column(DateTime, nullable=True)  # Last reference dropped; file awaits the reaper
+    
+    __table_args__ = (
+        Index("ix_media_blobs_released_at", "released_at"),
+    )
+
+
+class UploadSession(Base):
+    """
+    A resumable upload in progress. The bytes received so far are appended
+    to a temp file in UPLOAD_DIR, whose size is the current offset.
+    """
+    __tablename__ = "upload_sessions"
+    
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    filename = Column(String, nullable=True)
+    content_type = Column(String, nullable=False)
+    media_type = Column(String, nullable=False)  # 'image' or 'video'
+    size = Column(Integer, nullable=False)  # Total length declared by the client
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)  # Last chunk received
+
+
+class OutboundEmail(Base):
+    """
+    An email in the outbox. Rows are written by the request that produces the
+    email and delivered by the background sender (outbox.py). Failed sends
+    are retried with backoff; after OUTBOX_MAX_ATTEMPTS, or on a permanent
+    SMTP error, the row is kept with status 'dead' for inspection.
+    """
+    __tablename__ = "outbound_emails"
+    
+    id = Column(Integer, primary_key=True)
+    recipient = Column(String, nullable=False)
+    reply_to = Column(String, nullable=True)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String(16), nullable=False, default="pending")  # 'pending', 'sent' or 'dead'
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # Also the lease of a claimed batch
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_outbound_emails_status_next_attempt", "status", "next_attempt_at"),
+    )
@@ -0,0 +1,311 @@
+import asyncio
+import logging
+import math
+import random
+import smtplib
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .database import AsyncSessionLocal, db_writer
+from .metrics import OUTBOX_EMAILS, SMTP_CONNECTIONS
+from . import models, schemas
+
+logger = logging.getLogger(__name__)
+
+# Transactional outbox for email. Requests only insert a row, so they never
+# wait on the mail server; the sender claims due rows in batches, sends them
+# over one SMTP connection kept open between batches, and records each
+# result. A claimed batch is leased by pushing next_attempt_at forward, so
+# several processes can run senders; a process dying mid-batch means its
+# messages are sent again once the lease runs out (at-least-once delivery).
+
+PENDING = "pending"
+SENT = "sent"
+DEAD = "dead"
+
+# SMTP commands per message (MAIL, RCPT, DATA, end of data) and per
+# connection (greeting, EHLO, STARTTLS, EHLO, AUTH, QUIT); each one may wait
+# up to SMTP_TIMEOUT
+_COMMANDS_PER_MESSAGE = 4
+_COMMANDS_PER_CONNECTION = 6
+
+# Set by notify() so a queued message is sent without waiting for the next poll
+_wakeup: Optional[asyncio.Event] = None
+
+
+class SMTPConnection:
+    """
+    One SMTP session reused across messages and renewed after
+    SMTP_MAX_MESSAGES_PER_CONNECTION. Blocking: call from a thread, one
+    call at a time.
+    """
+
+    def __init__(self):
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._sent = 0
+        self._last_used = 0.0
+
+    def _open(self) -> None:
+        if settings.SMTP_SSL:
+            smtp = smtplib.SMTP_SSL(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT)
+        else:
+            smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT)
+        try:
+            if settings.SMTP_STARTTLS and not settings.SMTP_SSL:
+                smtp.starttls()
+            if settings.SMTP_USERNAME:
+                smtp.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD or "")
+        except BaseException:
+            smtp.close()
+            raise
+        SMTP_CONNECTIONS.inc()
+        self._smtp = smtp
+        self._sent = 0
+
+    def send(self, message: EmailMessage) -> None:
+        if self._smtp is not None and self._sent >= settings.SMTP_MAX_MESSAGES_PER_CONNECTION:
+            self.close()
+        reused = self._smtp is not None
+        if not reused:
+            self._open()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped an idle connection: reconnect once
+            self.close()
+            if not reused:
+                raise
+            self._open()
+            self._smtp.send_message(message)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+            # The server answered; the session is still usable
+            raise
+        except OSError:
+            self.close()
+            raise
+        finally:
+            self._last_used = time.monotonic()
+        self._sent += 1
+
+    @property
+    def connected(self) -> bool:
+        return self._smtp is not None
+
+    def close_if_idle(self) -> None:
+        if self._smtp is not None and time.monotonic() - self._last_used > settings.SMTP_IDLE_SECONDS:
+            self.close()
+
+    def close(self) -> None:
+        if self._smtp is None:
+            return
+        smtp, self._smtp = self._smtp, None
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+
+_connection = SMTPConnection()
+
+
+def notify() -> None:
+    """Wake the sender after queueing a message"""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def contact_email(message: schemas.ContactMessage) -> models.OutboundEmail:
+    """The email to the admin for a contact form message (add it to a session to queue it)"""
+    # Header values must stay on one line
+    name = " ".join(message.name.split())
+    return models.OutboundEmail(
+        recipient=settings.ADMIN_EMAIL,
+        reply_to=message.email,
+        subject=f"Contact message from {name}",
+        body=f"From: {name} <{message.email}>\n\n{message.message}\n",
+    )
+
+
+def _email_message(email: models.OutboundEmail) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.SMTP_FROM
+    message["To"] = email.recipient
+    if email.reply_to:
+        message["Reply-To"] = email.reply_to
+    message["Subject"] = email.subject
+    message.set_content(email.body)
+    return message
+
+
+def is_permanent(error: Exception) -> bool:
+    """5xx replies about the message or its recipients will not succeed on retry"""
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False  # A configuration problem; keep the messages until it is fixed
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(500 <= code < 600 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, in seconds, after `attempts` failed sends"""
+    delay = min(settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1)
+
+
+def _send_batch(messages: List[EmailMessage]) -> List[Optional[Exception]]:
+    """
+    Send messages in order over the shared connection and return each one's
+    error (None when sent). When the connection fails or cannot be opened
+    the remaining messages are not attempted and get that same error.
+    """
+    results: List[Optional[Exception]] = []
+    for message in messages:
+        try:
+            _connection.send(message)
+            results.append(None)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+            if _connection.connected:
+                # Refused by the server; the next message may still go through
+                results.append(e)
+                continue
+            # Connecting or logging in failed
+            results.extend([e] * (len(messages) - len(results)))
+            break
+        except OSError as e:
+            results.extend([e] * (len(messages) - len(results)))
+            break
+    return results
+
+
+def lease_seconds(messages: int) -> float:
+    """
+    How long a batch may take when every SMTP command runs into the timeout:
+    its messages plus every connection it can open, counting the connection
+    renewals and one reconnect (and resend) after the server dropped an idle
+    connection
+    """
+    connections = math.ceil(messages / settings.SMTP_MAX_MESSAGES_PER_CONNECTION) + 1
+    commands = (messages + 1) * _COMMANDS_PER_MESSAGE + connections * _COMMANDS_PER_CONNECTION
+    return settings.SMTP_TIMEOUT * commands
+
+
+async def _claim(db: AsyncSession, batch_size: int) -> List[models.OutboundEmail]:
+    """Lease up to batch_size due messages to this sender"""
+    now = datetime.utcnow()
+    async with db_writer():
+        emails = (await db.execute(
+            select(models.OutboundEmail)
+            .where(models.OutboundEmail.status == PENDING, models.OutboundEmail.next_attempt_at <= now)
+            .order_by(models.OutboundEmail.next_attempt_at, models.OutboundEmail.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )).scalars().all()
+        lease = now + timedelta(seconds=lease_seconds(len(emails)))
+        for email in emails:
+            email.next_attempt_at = lease
+        await db.commit()
+    return emails
+
+
+def _record(email: models.OutboundEmail, error: Optional[Exception], now: datetime) -> str:
+    """Apply one send result to its row and return the outcome"""
+    if error is None:
+        email.status = SENT
+        email.sent_at = now
+        email.last_error = None
+        return SENT
+    email.attempts += 1
+    email.last_error = f"{type(error).__name__}: {error}"[:1000]
+    if is_permanent(error) or email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = DEAD
+        logger.error(f"Email {email.id} to {email.recipient} dead-lettered after {email.attempts} attempts: {error}")
+        return DEAD
+    email.next_attempt_at = now + timedelta(seconds=retry_delay(email.attempts))
+    return "retried"
+
+
+async def deliver_pending(batch_size: Optional[int] = None) -> int:
+    """Send one batch of due messages and return how many were claimed"""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    async with AsyncSessionLocal() as db:
+        emails = await _claim(db, batch_size)
+        if not emails:
+            return 0
+        results = await run_in_threadpool(_send_batch, [_email_message(email) for email in emails])
+        now = datetime.utcnow()
+        async with db_writer():
+            for email, error in zip(emails, results):
+                OUTBOX_EMAILS.labels(_record(email, error, now)).inc()
+            await db.commit()
+    errors = [error for error in results if error is not None]
+    if errors:
+        logger.warning(f"Sent {len(emails) - len(errors)} of {len(emails)} queued emails: {errors[0]}")
+    return len(emails)
+
+
+async def _seconds_until_due() -> float:
+    """Time until the next pending message is due, at most the poll interval"""
+    async with AsyncSessionLocal() as db:
+        due = (await db.execute(
+            select(func.min(models.OutboundEmail.next_attempt_at))
+            .where(models.OutboundEmail.status == PENDING)
+        )).scalar_one()
+    if due is None:
+        return settings.OUTBOX_POLL_INTERVAL_SECONDS
+    wait = (due - datetime.utcnow()).total_seconds()
+    return min(max(wait, 0), settings.OUTBOX_POLL_INTERVAL_SECONDS)
+
+
+async def prune_sent() -> int:
+    """Delete sent messages older than the retention period"""
+    cutoff = datetime.utcnow() - timedelta(days=settings.OUTBOX_SENT_RETENTION_DAYS)
+    async with AsyncSessionLocal() as db:
+        async with db_writer():
+            result = await db.execute(
+                delete(models.OutboundEmail)
+                .where(models.OutboundEmail.status == SENT, models.OutboundEmail.sent_at < cutoff)
+            )
+            await db.commit()
+    return result.rowcount
+
+
+async def run_outbox_sender() -> None:
+    """Background loop sending queued email until cancelled"""
+    global _wakeup
+    if not settings.SMTP_HOST:
+        logger.warning("SMTP_HOST is not set: outbound email stays queued")
+        return
+    _wakeup = asyncio.Event()
+    next_prune = 0.0
+    try:
+        while True:
+            _wakeup.clear()
+            wait = settings.OUTBOX_POLL_INTERVAL_SECONDS
+            try:
+                while await deliver_pending() >= settings.OUTBOX_BATCH_SIZE:
+                    pass
+                if time.monotonic() >= next_prune:
+                    await prune_sent()
+                    next_prune = time.monotonic() + 3600
+                await run_in_threadpool(_connection.close_if_idle)
+                # Wake up for retries that fall due before the next poll
+                wait = await _seconds_until_due()
+            except Exception as e:
+                logger.error(f"Outbox sender failed: {e}")
+            try:
+                await asyncio.wait_for(_wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        _wakeup = None
+        # QUIT waits for the server, so never on the event loop
+        await run_in_threadpool(_connection.close)
@@ -0,0 +1,44 @@
+import secrets
+from typing import Hashable, Optional, Tuple
+
+from fastapi import Request
+
+from .cache import SizedLRUCache, VersionCounter
+from .config import settings
+
+# Every change to a user's reports (create, delete, thumbnail results) bumps
+# that user's data version. Report responses are identified by the version,
+# so an unchanged version means an unchanged response: it backs the ETag of
+# list_reports/get_report and keys the cache of rendered pages. Versions live
+# in this process and restart with it; the random epoch keeps ETags from a
+# previous run from ever matching.
+
+_epoch = secrets.token_hex(4)
+_versions = VersionCounter()
+
+# Rendered response bodies and headers, keyed by (user, version, path, query)
+pages = SizedLRUCache(max_bytes=settings.PAGE_CACHE_MAX_BYTES)
+
+
+def bump_data_version(user_id: int) -> None:
+    """Invalidate every cached response and ETag for a user's reports"""
+    _versions.bump(user_id)
+
+
+def data_etag(user_id: int) -> str:
+    """Current entity tag shared by all report responses of a user"""
+    return f'"{_epoch}-{user_id}-{_versions.get(user_id)}"'
+
+
+def page_key(request: Request, user_id: int, etag: str) -> Hashable:
+    """Cache key of a response; query parameters are order-insensitive"""
+    return (user_id, etag, request.url.path, tuple(sorted(request.query_params.multi_items())))
+
+
+def cached_page(key: Hashable) -> Optional[Tuple[bytes, dict]]:
+    """Return (body, headers) of a rendered response, or None"""
+    return pages.get(key)
+
+
+def store_page(key: Hashable, body: bytes, headers: dict) -> None:
+    pages.set(key, (body, headers), len(body))
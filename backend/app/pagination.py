@@ -0,0 +1,56 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded or does not match the query"""
+
+
+def encode_cursor(sort_by: str, sort_order: str, value: Any, row_id: int) -> str:
+    """
+    Encode the sort key and id of the last row of a page as an opaque cursor.
+    The sort column and order are embedded so a cursor cannot be replayed
+    against a differently sorted query.
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort_by, sort_order, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str) -> Tuple[Any, int]:
+    """Decode a cursor produced by encode_cursor and return (sort value, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort_by, cursor_order, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Malformed cursor")
+
+    if (cursor_sort_by, cursor_order) != (sort_by, sort_order):
+        raise InvalidCursorError("Cursor does not match sort_by/sort_order")
+    if not isinstance(row_id, int):
+        raise InvalidCursorError("Malformed cursor")
+
+    if sort_by == "created_at":
+        try:
+            value = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise InvalidCursorError("Malformed cursor")
+    elif not isinstance(value, int):
+        raise InvalidCursorError("Malformed cursor")
+
+    return value, row_id
+
+
+def next_cursor_for(rows: list, limit: int, sort_by: str, sort_order: str) -> Optional[str]:
+    """
+    Return the cursor of the page after rows, or None on the last page.
+    rows is expected to hold up to limit + 1 items; the extra row only
+    signals that another page exists and is trimmed by the caller.
+    """
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(sort_by, sort_order, getattr(last, sort_by), last.id)
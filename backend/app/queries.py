@@ -0,0 +1,165 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Annotated, Optional
+from fastapi import Query
+from sqlalchemy import Select, select, union_all
+from . import models
+from .geo import covering_prefixes, distance_m, prefix_range, radius_bbox
+
+
+SORT_COLUMNS = ("created_at", "behavior_rating", "severity_index")
+
+
+@dataclass
+class ReportFilters:
+    """
+    Filter parameters shared by every endpoint that selects a user's reports
+    """
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    rating_min: Annotated[Optional[int], Query(ge=1, le=5)] = None
+    rating_max: Annotated[Optional[int], Query(ge=1, le=5)] = None
+    severity_min: Annotated[Optional[int], Query(ge=0, le=100)] = None
+    severity_max: Annotated[Optional[int], Query(ge=0, le=100)] = None
+
+
+@dataclass
+class GeoFilter:
+    """
+    Location filter: a bounding box (min/max lat/lon) and/or a circle
+    (near_lat, near_lon, radius_m). Only geotagged reports match.
+    """
+    min_lat: Annotated[Optional[float], Query(ge=-90, le=90)] = None
+    min_lon: Annotated[Optional[float], Query(ge=-180, le=180)] = None
+    max_lat: Annotated[Optional[float], Query(ge=-90, le=90)] = None
+    max_lon: Annotated[Optional[float], Query(ge=-180, le=180)] = None
+    near_lat: Annotated[Optional[float], Query(ge=-90, le=90)] = None
+    near_lon: Annotated[Optional[float], Query(ge=-180, le=180)] = None
+    radius_m: Annotated[Optional[float], Query(gt=0, le=20000000)] = None
+
+    def bbox(self) -> Optional[tuple]:
+        """Return (min_lat, min_lon, max_lat, max_lon) or None; raises ValueError if incomplete"""
+        values = (self.min_lat, self.min_lon, self.max_lat, self.max_lon)
+        if all(v is None for v in values):
+            return None
+        if any(v is None for v in values):
+            raise ValueError("min_lat, min_lon, max_lat and max_lon must be given together")
+        if self.min_lat > self.max_lat or self.min_lon > self.max_lon:
+            raise ValueError("Bounding box minimums must not exceed maximums")
+        return values
+
+    def is_set(self) -> bool:
+        """Whether any location parameter was given"""
+        return any(value is not None for value in vars(self).values())
+
+    def circle(self) -> Optional[tuple]:
+        """Return (lat, lon, radius_m) or None; raises ValueError if incomplete"""
+        values = (self.near_lat, self.near_lon, self.radius_m)
+        if all(v is None for v in values):
+            return None
+        if any(v is None for v in values):
+            raise ValueError("near_lat, near_lon and radius_m must be given together")
+        return values
+
+
+def geohash_cover(user_id: int, bbox: tuple):
+    """
+    Condition on report id: among the user's reports found by one range read
+    of (user_id, geohash) per cell covering bbox. Use it with
+    report_list_query(narrowed=True) so the planner reads these candidates
+    first instead of walking a sort index over all of the user's reports.
+    """
+    cells = [
+        select(models.Report.id).where(
+            models.Report.user_id == user_id, models.Report.geohash >= low, models.Report.geohash < high
+        )
+        for low, high in map(prefix_range, covering_prefixes(*bbox))
+    ]
+    return models.Report.id.in_(union_all(*cells) if len(cells) > 1 else cells[0])
+
+
+def apply_geo_filter(stmt: Select, geo: GeoFilter, user_id: int) -> Select:
+    """
+    Restrict a statement over a user's reports to a bounding box and/or radius.
+    Candidates are found through the (user_id, geohash) index by the cells
+    covering the area, then refined exactly on latitude/longitude and, for a
+    radius, by haversine distance; only the candidates are sorted and paged.
+    """
+    bbox = geo.bbox()
+    circle = geo.circle()
+
+    if bbox:
+        min_lat, min_lon, max_lat, max_lon = bbox
+        stmt = stmt.where(
+            geohash_cover(user_id, bbox),
+            models.Report.latitude.between(min_lat, max_lat),
+            models.Report.longitude.between(min_lon, max_lon),
+        )
+    if circle:
+        lat, lon, radius = circle
+        circle_bbox = radius_bbox(lat, lon, radius)
+        stmt = stmt.where(
+            geohash_cover(user_id, circle_bbox),
+            models.Report.latitude.between(circle_bbox[0], circle_bbox[2]),
+            models.Report.longitude.between(circle_bbox[1], circle_bbox[3]),
+            distance_m(models.Report.latitude, models.Report.longitude, lat, lon) <= radius,
+        )
+    return stmt
+
+
+def apply_report_filters(stmt: Select, filters: ReportFilters) -> Select:
+    """Apply date, rating and severity filters to a statement over reports"""
+    if filters.date_from:
+        stmt = stmt.where(models.Report.created_at >= filters.date_from)
+    if filters.date_to:
+        stmt = stmt.where(models.Report.created_at <= filters.date_to)
+
+    if filters.rating_min is not None:
+        stmt = stmt.where(models.Report.behavior_rating >= filters.rating_min)
+    if filters.rating_max is not None:
+        stmt = stmt.where(models.Report.behavior_rating <= filters.rating_max)
+
+    if filters.severity_min is not None:
+        stmt = stmt.where(models.Report.severity_index >= filters.severity_min)
+    if filters.severity_max is not None:
+        stmt = stmt.where(models.Report.severity_index <= filters.severity_max)
+
+    return stmt
+
+
+def report_list_query(
+    user_id: int,
+    filters: ReportFilters,
+    sort_by: str = "created_at",
+    sort_order: str = "desc",
+    narrowed: bool = False,
+) -> Select:
+    """
+    Build the filtered, sorted statement behind list_reports.
+    id is used as tie-breaker so the order is total, which keyset pagination
+    relies on and which the (user_id, <sort column>, id) indexes serve directly.
+
+    Pass narrowed=True when a geo or full-text filter will supply the
+    candidate rows. The user condition is then written so no index can serve
+    it; otherwise the planner walks the sort index over every report of the
+    user and tests each row against the filter, instead of reading the
+    candidates through their own index and sorting only those.
+    """
+    if narrowed:
+        stmt = select(models.Report).where(models.Report.user_id + 0 == user_id)
+    else:
+        stmt = select(models.Report).where(models.Report.user_id == user_id)
+    stmt = apply_report_filters(stmt, filters)
+
+    sort_column = getattr(models.Report, sort_by)
+    if sort_order == "desc":
+        return stmt.order_by(sort_column.desc(), models.Report.id.desc())
+    return stmt.order_by(sort_column.asc(), models.Report.id.asc())
+
+
+def report_by_id_query(user_id: int, report_id: int) -> Select:
+    """Build the statement selecting one report owned by a user"""
+    return select(models.Report).where(
+        models.Report.id == report_id,
+        models.Report.user_id == user_id
+    )
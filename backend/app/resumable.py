@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Iterator, Set
+
+import aiofiles
+from sqlalchemy import delete, select
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .database import AsyncSessionLocal, db_writer
+from .media import UploadTooLargeError
+from .metrics import UPLOAD_BYTES, UPLOAD_DURATION
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# Sessions with a PATCH or finalize running in this process
+_busy: Set[str] = set()
+
+
+class SessionBusyError(Exception):
+    """Raised when a session is already receiving data or being finalized"""
+
+
+def session_file(session_id: str) -> str:
+    """Temp file holding the bytes received so far (hidden, so never served)"""
+    return os.path.join(settings.UPLOAD_DIR, f".{session_id}.upload")
+
+
+def current_offset(session_id: str) -> int:
+    """Bytes received so far; the file on disk is the source of truth"""
+    try:
+        return os.stat(session_file(session_id)).st_size
+    except FileNotFoundError:
+        return 0
+
+
+@contextmanager
+def exclusive(session_id: str) -> Iterator[None]:
+    """Allow one writer per session, so two PATCHes never interleave bytes"""
+    if session_id in _busy:
+        raise SessionBusyError(session_id)
+    _busy.add(session_id)
+    try:
+        yield
+    finally:
+        _busy.discard(session_id)
+
+
+async def append_chunks(session_id: str, chunks: AsyncIterator[bytes], max_bytes: int) -> int:
+    """
+    Append a request body to the session file block by block and return the
+    new offset. Blocks are written as they arrive, so bytes received before a
+    dropped connection are kept and the client resumes from there.
+    Raises UploadTooLargeError, keeping the blocks before it, past max_bytes.
+    """
+    written = 0
+    started = time.perf_counter()
+    async with aiofiles.open(session_file(session_id), "ab") as buffer:
+        try:
+            async for chunk in chunks:
+                if written + len(chunk) > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                await buffer.write(chunk)
+                written += len(chunk)
+        finally:
+            await buffer.flush()
+            await run_in_threadpool(os.fsync, buffer.fileno())
+            UPLOAD_BYTES.labels("resumable").inc(written)
+            UPLOAD_DURATION.labels("resumable").observe(time.perf_counter() - started)
+    return current_offset(session_id)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(settings.UPLOAD_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+async def hash_session(session_id: str) -> str:
+    """SHA-256 of a completed session's file, computed off the event loop"""
+    return await run_in_threadpool(_hash_file, session_file(session_id))
+
+
+def remove_session_file(session_id: str) -> None:
+    try:
+        os.remove(session_file(session_id))
+    except FileNotFoundError:
+        pass
+
+
+async def collect_stale_sessions() -> int:
+    """Delete sessions idle for longer than the TTL, with their files"""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.RESUMABLE_SESSION_TTL_SECONDS)
+    async with AsyncSessionLocal() as db:
+        stale = (await db.execute(
+            select(models.UploadSession.id).where(models.UploadSession.updated_at < cutoff)
+        )).scalars().all()
+        stale = [session_id for session_id in stale if session_id not in _busy]
+        if not stale:
+            return 0
+        async with db_writer():
+            await db.execute(delete(models.UploadSession).where(models.UploadSession.id.in_(stale)))
+            await db.commit()
+    for session_id in stale:
+        await run_in_threadpool(remove_session_file, session_id)
+    logger.info(f"Removed {len(stale)} stale upload sessions")
+    return len(stale)
+
+
+async def run_session_gc() -> None:
+    """Background loop collecting stale sessions until cancelled"""
+    while True:
+        try:
+            await collect_stale_sessions()
+        except Exception as e:
+            logger.error(f"Upload session cleanup failed: {e}")
+        await asyncio.sleep(settings.RESUMABLE_GC_INTERVAL_SECONDS)
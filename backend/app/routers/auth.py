@@ -1,22 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
+import logging
 from .. import models, schemas
-from ..database import get_db
-from ..auth import verify_password, get_password_hash, create_access_token, get_current_user
+from ..database import get_db, db_writer
+from ..auth import hash_password, verify_and_update_password, create_access_token, PasswordHasherBusy
+from ..dependencies import get_current_user, CurrentUser
 from ..config import settings
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+logger = logging.getLogger(__name__)
+
+
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in attempts in progress, retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
 
 @router.post("/register", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Register a new user
     """
     # Check if user already exists
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+    result = await db.execute(select(models.User).where(models.User.email == user.email))
+    db_user = result.scalar_one_or_none()
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -24,12 +38,16 @@ async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await hash_password(user.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     db_user = models.User(email=user.email, hashed_password=hashed_password)
     
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    async with db_writer():
+        db.add(db_user)
+        await db.commit()
+        await db.refresh(db_user)
     
     return db_user
 
@@ -38,26 +56,45 @@ async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
 async def login(
     response: Response,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Login user and return JWT token in HTTP-only cookie
     """
     # Find user
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
+    result = await db.execute(select(models.User).where(models.User.email == form_data.username))
+    user = result.scalar_one_or_none()
     
     # Verify password
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = False, None
+    if user:
+        try:
+            valid, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+        except PasswordHasherBusy:
+            raise _hasher_busy()
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    email, user_id = user.email, user.id
+    
+    # Upgrade hashes made with an older scheme or cost
+    if new_hash:
+        try:
+            async with db_writer():
+                user.hashed_password = new_hash
+                await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Could not rehash password for user {user_id}: {e}")
+    
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": email}, expires_delta=access_token_expires
     )
     
     # Set HTTP-only cookie
@@ -84,7 +121,7 @@ async def logout(response: Response):
 
 
 @router.get("/me", response_model=schemas.UserResponse)
-async def get_current_user_info(current_user: models.User = Depends(get_current_user)):
+async def get_current_user_info(current_user: CurrentUser = Depends(get_current_user)):
     """
     Get current user information
     """
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException, status
-from .. import schemas
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import outbox, schemas
 from ..config import settings
+from ..database import get_db, db_writer
 import logging
 
 router = APIRouter(prefix="/contact", tags=["contact"])
@@ -11,16 +13,21 @@ logger = logging.getLogger(__name__)
 
 
 @router.post("/", status_code=status.HTTP_200_OK)
-async def send_contact_message(message: schemas.ContactMessage):
+async def send_contact_message(
+    message: schemas.ContactMessage,
+    db: AsyncSession = Depends(get_db)
+):
     """
-    Send a contact message to admin
-    For now, this logs the message. In production, integrate with email service.
+    Send a contact message to admin.
+    The email is queued in the outbox and sent in the background, so the
+    response never waits on the mail server.
     """
-    # Log the contact message
-    logger.info(f"Contact message from {message.name} ({message.email}): {message.message}")
-    
-    # In production, you would send an email here
-    # Example using SMTP or a service like SendGrid, AWS SES, etc.
+    email = outbox.contact_email(message)
+    async with db_writer():
+        db.add(email)
+        await db.commit()
+    outbox.notify()
+    logger.info(f"Queued contact message {email.id} from {message.email}")
     
     return {
         "message": "Your message has been sent successfully",
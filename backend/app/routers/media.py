@@ -0,0 +1,222 @@
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import RedirectResponse, Response
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+from typing import Optional, Tuple
+import mimetypes
+import os
+from ..config import settings
+from ..media import ingest_stream, place_upload, discard_upload, safe_extension, UploadTooLargeError
+from ..storage import LocalStorage, get_storage
+
+router = APIRouter(prefix="/uploads", tags=["media"])
+
+
+class MediaFileResponse(Response):
+    """
+    Sends a byte range of a file. Uses the ASGI zero-copy extension
+    (sendfile) when the server offers it, otherwise streams fixed-size blocks
+    so memory stays bounded however large the file is.
+    """
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, start: int, length: int, status_code: int, headers: dict, send_body: bool):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.start = start
+        self.length = length
+        self.send_body = send_body
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+                return
+
+            await run_in_threadpool(f.seek, self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await run_in_threadpool(f.read, min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us; end the response
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def resolve_media_path(file_path: str) -> str:
+    """Map a request path to a file inside UPLOAD_DIR, refusing traversal and hidden files"""
+    root = os.path.realpath(settings.UPLOAD_DIR)
+    full_path = os.path.realpath(os.path.join(root, file_path))
+    name = os.path.basename(full_path)
+    if os.path.commonpath([root, full_path]) != root or name.startswith(".") or not os.path.isfile(full_path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return full_path
+
+
+def make_etag(stat: os.stat_result) -> str:
+    """
+    Strong validator in nginx's format, so it is stable whether Python or nginx
+    sends the file; uploads are written once under unique names and never modified
+    """
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Evaluate an If-None-Match header (weak comparison, as RFC 9110 requires)"""
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header into an inclusive (start, end).
+    Returns None when the header should be ignored (malformed or multiple
+    ranges, which are served as a full 200 response); raises ValueError when
+    the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix <= 0:
+                raise ValueError("Empty suffix range")
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        if first == "":
+            raise
+        return None
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+@router.put("/direct/{token}", status_code=status.HTTP_204_NO_CONTENT)
+async def direct_upload(token: str, request: Request):
+    """
+    Receive a direct upload presigned by the local storage driver. The body
+    must match the signed length and SHA-256, as S3 would enforce.
+    """
+    claims = LocalStorage.verify_put(token)
+    if claims is None or not get_storage().is_local:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired upload URL")
+
+    try:
+        stored = await ingest_stream(
+            request.stream(), settings.UPLOAD_DIR, safe_extension(claims["key"]), claims["size"]
+        )
+    except UploadTooLargeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body is larger than the signed size")
+    try:
+        if stored.size != claims["size"] or stored.sha256 != claims["sha256"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Body does not match the signed size and SHA-256"
+            )
+        stored.path = claims["key"]
+        await place_upload(stored)
+    finally:
+        await discard_upload(stored)
+    return None
+
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_media(file_path: str, request: Request):
+    """
+    Serve an uploaded media file with Range (206) support, strong ETags,
+    conditional GET and immutable caching. When MEDIA_ACCEL_REDIRECT_PREFIX is
+    set, nginx is asked to send the bytes via X-Accel-Redirect instead.
+    With remote storage, redirect to a presigned download URL.
+    """
+    storage = get_storage()
+    if not storage.is_local:
+        if ".." in file_path.split("/"):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+        expires_in = settings.PRESIGNED_URL_EXPIRE_SECONDS
+        url = storage.presign_get(Path(settings.UPLOAD_DIR, file_path).as_posix(), expires_in)
+        return RedirectResponse(
+            url,
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+            headers={"Cache-Control": f"private, max-age={expires_in // 2}"},
+        )
+
+    full_path = resolve_media_path(file_path)
+    stat = os.stat(full_path)
+    etag = make_etag(stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable",
+        "Accept-Ranges": "bytes",
+    }
+
+    # Conditional GET
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    not_modified = False
+    if if_none_match is not None:
+        not_modified = etag_matches(if_none_match, etag)
+    elif if_modified_since:
+        try:
+            not_modified = int(stat.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            not_modified = False
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        # nginx handles Range itself for internal redirects
+        relative = os.path.relpath(full_path, os.path.realpath(settings.UPLOAD_DIR)).replace(os.sep, "/")
+        headers["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relative
+        return Response(headers=headers, media_type=media_type)
+
+    size = stat.st_size
+    start, end = 0, size - 1
+    status_code = status.HTTP_200_OK
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and size > 0 and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{size}"},
+            )
+        if byte_range:
+            start, end = byte_range
+            status_code = status.HTTP_206_PARTIAL_CONTENT
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = max(end - start + 1, 0)
+    headers["Content-Length"] = str(length)
+    headers["Content-Type"] = media_type
+    return MediaFileResponse(
+        full_path, start, length, status_code, headers, send_body=request.method != "HEAD"
+    )
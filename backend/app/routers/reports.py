@@ -1,65 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional, Tuple
-from datetime import datetime
-import os
+from fastapi import APIRouter, Depends, Header, HTTPException, status, UploadFile, File, Form, Request, Query, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Hashable, List, Optional, Tuple
+from pydantic import ValidationError
+from datetime import datetime, timedelta
+import asyncio
+import json
+import logging
 import uuid
-from pathlib import Path
-from PIL import Image
-from .. import models, schemas
-from ..database import get_db
-from ..dependencies import get_current_user
+from starlette.concurrency import run_in_threadpool
+from .. import models, resumable, schemas
+from ..database import get_db, db_writer
+from ..dependencies import get_current_user, CurrentUser
 from ..config import settings
+from ..media import (
+    StoredMedia, ingest_upload, acquire_blob, discard_upload, release_blob,
+    content_path, safe_extension, media_type_for, create_upload_ticket, read_upload_ticket,
+    InvalidUploadError, UploadTooLargeError,
+)
+from ..queries import (
+    ReportFilters, GeoFilter, SORT_COLUMNS, apply_geo_filter, geohash_cover,
+    report_list_query, report_by_id_query,
+)
+from ..export import (
+    EXPORT_FORMATS, EXPORT_MEDIA_TYPES, export_query, parquet_available,
+    stream_export, stream_export_zip,
+)
+from ..geo import cluster_precision, encode_geohash
+from ..pagination import decode_cursor, next_cursor_for, InvalidCursorError
+from ..search import apply_search, search_terms
+from ..serialization import report_columns_query, report_dict
+from ..metrics import PAGE_CACHE_REQUESTS
+from ..page_cache import bump_data_version, cached_page, data_etag, page_key, store_page
+from .media import etag_matches
+from ..storage import get_storage
+from ..stats import compute_stats, record_report_created, record_report_deleted
+from ..thumbnails import enqueue_thumbnail, THUMBNAIL_PENDING
 
-router = APIRouter(prefix="/reports", tags=["reports"])
-
+logger = logging.getLogger(__name__)
 
-def save_upload_file(upload_file: UploadFile, upload_dir: str) -> Tuple[str, Optional[str]]:
-    """
-    Save uploaded file and return the file path and optional thumbnail path.
-    Ensures all paths use forward slashes.
-    """
-    # Create upload directory if it doesn't exist
-    Path(upload_dir).mkdir(parents=True, exist_ok=True)
-    
-    # Generate unique filename
-    file_extension = os.path.splitext(upload_file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(upload_dir, unique_filename)
-    
-    # Save original file
-    with open(file_path, "wb") as buffer:
-        content = upload_file.file.read()
-        buffer.write(content)
-    
-    # Generate thumbnail for images
-    thumbnail_path = None
-    if upload_file.content_type.startswith("image/"):
-        try:
-            with Image.open(file_path) as img:
-                # Convert to RGB if necessary (e.g. for PNGs with transparency)
-                if img.mode in ('RGBA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Create thumbnail
-                img.thumbnail((300, 300))
-                
-                # Save thumbnail
-                thumb_filename = f"thumb_{unique_filename}"
-                thumb_path = os.path.join(upload_dir, thumb_filename)
-                img.save(thumb_path, "JPEG", quality=85)
-                
-                # Normalize path to use forward slashes
-                thumbnail_path = Path(thumb_path).as_posix()
-        except Exception as e:
-            print(f"Error generating thumbnail: {e}")
-            # If thumbnail generation fails, we just don't have a thumbnail
-            pass
-            
-    # Normalize original path to use forward slashes
-    normalized_file_path = Path(file_path).as_posix()
-    
-    return normalized_file_path, thumbnail_path
+router = APIRouter(prefix="/reports", tags=["reports"])
 
 
 @router.post("/", response_model=schemas.ReportResponse, status_code=status.HTTP_201_CREATED)
@@ -72,8 +54,8 @@ async def create_report(
     latitude: Optional[float] = Form(None),
     longitude: Optional[float] = Form(None),
     camera_used: Optional[str] = Form(None),
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new report with media upload
@@ -86,139 +68,743 @@ async def create_report(
             detail="Description must not exceed 150 words"
         )
     
-    # Determine media type and validate size
-    media_type = "image" if media.content_type.startswith("image/") else "video"
-    file_size = 0
+    # Determine media type and size limit
+    media_type = media_type_for(media.content_type)
+    max_size = _max_media_size(media_type)
     
-    # Read file to check size
-    content = await media.read()
-    file_size = len(content)
-    await media.seek(0)  # Reset file pointer
+    # Stream media file to disk (size enforced per block), hashing it
+    try:
+        stored = await ingest_upload(media, settings.UPLOAD_DIR, max_size)
+    except UploadTooLargeError:
+        raise _media_too_large(media_type)
+    
+    try:
+        db_report = await _save_report(
+            db, request, current_user, stored, media_type,
+            schemas.ReportCreate.model_construct(
+                description=description,
+                behavior_rating=behavior_rating,
+                severity_index=severity_index,
+                latitude=latitude,
+                longitude=longitude,
+                camera_used=camera_used,
+            ),
+        )
+    finally:
+        await discard_upload(stored)
     
-    if media_type == "image" and file_size > settings.MAX_IMAGE_SIZE:
+    return db_report
+
+
+@router.post("/batch", response_model=List[schemas.BatchItemResult])
+async def create_reports_batch(
+    request: Request,
+    items: str = Form(..., description="JSON array of reports; item i uses the i-th media file"),
+    media: List[UploadFile] = File(...),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Create several reports in one request, e.g. when an offline client
+    flushes its queue. Items are validated and reported individually; media
+    files are written in parallel and every valid report is inserted in a
+    single transaction. Items whose idempotency_key was used before come back
+    as duplicates carrying the existing report, so retried flushes are safe.
+    """
+    try:
+        raw_items = json.loads(items)
+    except ValueError:
+        raw_items = None
+    if not isinstance(raw_items, list) or not raw_items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="items must be a non-empty JSON array")
+    if len(raw_items) > settings.BATCH_MAX_ITEMS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Image size must not exceed {settings.MAX_IMAGE_SIZE / 1024 / 1024}MB"
+            detail=f"A batch holds at most {settings.BATCH_MAX_ITEMS} reports"
         )
-    elif media_type == "video" and file_size > settings.MAX_VIDEO_SIZE:
+    if len(raw_items) != len(media):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Each item needs exactly one media file")
+    
+    results: List[Optional[schemas.BatchItemResult]] = [None] * len(raw_items)
+    
+    def fail(index: int, detail: str) -> None:
+        results[index] = schemas.BatchItemResult(index=index, status="error", detail=detail)
+    
+    # Validate every item
+    valid = {}
+    keys = {}
+    for index, raw in enumerate(raw_items):
+        try:
+            item = schemas.BatchReportItem.model_validate(raw)
+        except ValidationError as e:
+            fail(index, "; ".join(error["msg"] for error in e.errors()))
+            continue
+        if item.idempotency_key in keys:
+            fail(index, "idempotency_key is repeated in this batch")
+            continue
+        if item.idempotency_key is not None:
+            keys[item.idempotency_key] = index
+        valid[index] = item
+    
+    # Items created by an earlier attempt of the same flush
+    if keys:
+        existing = await db.scalars(select(models.Report).where(
+            models.Report.user_id == current_user.id,
+            models.Report.idempotency_key.in_(list(keys)),
+        ))
+        for report in existing:
+            index = keys[report.idempotency_key]
+            results[index] = schemas.BatchItemResult(
+                index=index, status="duplicate", report=schemas.ReportResponse.model_validate(report)
+            )
+            del valid[index]
+    
+    # Write media in parallel
+    async def ingest(index: int):
+        media_type = media_type_for(media[index].content_type)
+        return media_type, await ingest_upload(media[index], settings.UPLOAD_DIR, _max_media_size(media_type))
+    
+    outcomes = await asyncio.gather(*(ingest(index) for index in valid), return_exceptions=True)
+    staged = []
+    for index, outcome in zip(list(valid), outcomes):
+        if isinstance(outcome, UploadTooLargeError):
+            fail(index, _media_too_large(media_type_for(media[index].content_type)).detail)
+        elif isinstance(outcome, BaseException):
+            logger.error(f"Could not store media of batch item {index}: {outcome}")
+            fail(index, "Could not store media")
+        else:
+            staged.append((index, *outcome))
+    
+    # One bulk insert and one commit for every staged report
+    device_info = request.headers.get("user-agent", "Unknown")
+    try:
+        if staged:
+            rows = [
+                {
+                    **_report_values(current_user, stored, media_type, valid[index], device_info),
+                    "idempotency_key": valid[index].idempotency_key,
+                }
+                for index, media_type, stored in staged
+            ]
+            async with db_writer():
+                try:
+                    created = (await db.scalars(
+                        insert(models.Report).returning(models.Report, sort_by_parameter_order=True), rows
+                    )).all()
+                    for report, (_, _, stored) in zip(created, staged):
+                        await record_report_created(db, report)
+                        await acquire_blob(db, stored)
+                    await db.commit()
+                    bump_data_version(current_user.id)
+                except IntegrityError:
+                    # Another request inserted one of these idempotency keys first
+                    await db.rollback()
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="A concurrent request is creating these reports; retry the batch"
+                    )
+    finally:
+        for _, _, stored in staged:
+            await discard_upload(stored)
+    
+    for report, (index, media_type, stored) in zip(created if staged else [], staged):
+        if media_type == "image":
+            enqueue_thumbnail(report.id, stored.path)
+        results[index] = schemas.BatchItemResult(
+            index=index, status="created", report=schemas.ReportResponse.model_validate(report)
+        )
+    
+    return results
+
+
+@router.post("/uploads", response_model=schemas.UploadTicket, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    upload: schemas.DirectUploadRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Start a direct upload. PUT the media to the returned URL with the returned
+    headers (straight to object storage when S3 is configured), then create
+    the report with POST /reports/finalize. When the same file is already
+    stored, already_stored is true and no upload is needed.
+    """
+    media_type = media_type_for(upload.content_type)
+    if upload.size > _max_media_size(media_type):
+        raise _media_too_large(media_type)
+    
+    media = StoredMedia(
+        path=content_path(settings.UPLOAD_DIR, upload.sha256, safe_extension(upload.filename)),
+        sha256=upload.sha256,
+        size=upload.size,
+    )
+    storage = get_storage()
+    expires_in = settings.PRESIGNED_URL_EXPIRE_SECONDS
+    already_stored = await run_in_threadpool(storage.size, media.path) == upload.size
+    url, headers = None, {}
+    if not already_stored:
+        url, headers = storage.presign_put(
+            media.path, upload.content_type, upload.size, upload.sha256, expires_in
+        )
+    
+    return schemas.UploadTicket(
+        upload_token=create_upload_ticket(current_user.id, media, media_type, expires_in),
+        already_stored=already_stored,
+        url=url,
+        headers=headers,
+        expires_at=datetime.utcnow() + timedelta(seconds=expires_in),
+    )
+
+
+@router.post("/finalize", response_model=schemas.ReportResponse, status_code=status.HTTP_201_CREATED)
+async def finalize_report(
+    report: schemas.ReportFinalize,
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Create a report from media uploaded with POST /reports/uploads
+    """
+    try:
+        media, media_type = read_upload_ticket(report.upload_token, current_user.id)
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return await _save_report(db, request, current_user, media, media_type, report)
+
+
+@router.post(
+    "/uploads/resumable", response_model=schemas.UploadSessionResponse, status_code=status.HTTP_201_CREATED
+)
+async def create_upload_session(
+    upload: schemas.UploadRequest,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Start a resumable upload. Send the file in any number of PATCH requests
+    (Upload-Offset header, application/offset+octet-stream body), use HEAD to
+    find the offset to resume from after a dropped connection, then create the
+    report with POST .../{session_id}/finalize.
+    """
+    media_type = media_type_for(upload.content_type)
+    if upload.size > _max_media_size(media_type):
+        raise _media_too_large(media_type)
+    
+    open_sessions = await db.scalar(
+        select(func.count()).select_from(models.UploadSession)
+        .where(models.UploadSession.user_id == current_user.id)
+    )
+    if open_sessions >= settings.RESUMABLE_MAX_SESSIONS_PER_USER:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Video size must not exceed {settings.MAX_VIDEO_SIZE / 1024 / 1024}MB"
+            detail="Too many unfinished uploads; finish or cancel one first"
+        )
+    
+    session = models.UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=current_user.id,
+        filename=upload.filename,
+        content_type=upload.content_type,
+        media_type=media_type,
+        size=upload.size,
+    )
+    async with db_writer():
+        db.add(session)
+        await db.commit()
+    
+    response.headers["Location"] = f"/reports/uploads/resumable/{session.id}"
+    return _session_response(session, 0)
+
+
+@router.head("/uploads/resumable/{session_id}")
+async def get_upload_offset(
+    session_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Report how many bytes of a resumable upload have been received
+    """
+    session = await _get_upload_session(db, session_id, current_user)
+    return Response(headers={
+        "Upload-Offset": str(resumable.current_offset(session.id)),
+        "Upload-Length": str(session.size),
+        "Cache-Control": "no-store",
+    })
+
+
+@router.patch("/uploads/resumable/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_chunk(
+    session_id: str,
+    request: Request,
+    upload_offset: int = Header(..., ge=0),
+    content_type: str = Header(...),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Append a chunk to a resumable upload. Upload-Offset must equal the
+    current offset; the body is written to disk as it arrives.
+    """
+    if content_type != "application/offset+octet-stream":
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Chunks must be sent as application/offset+octet-stream"
         )
+    session = await _get_upload_session(db, session_id, current_user)
     
-    # Save media file and generate thumbnail
-    media_path, thumbnail_path = save_upload_file(media, settings.UPLOAD_DIR)
+    try:
+        with resumable.exclusive(session.id):
+            offset = resumable.current_offset(session.id)
+            if upload_offset != offset:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Upload-Offset must be {offset}",
+                    headers={"Upload-Offset": str(offset)},
+                )
+            try:
+                offset = await resumable.append_chunks(session.id, request.stream(), session.size - offset)
+            except UploadTooLargeError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Chunk goes past the declared upload size",
+                    headers={"Upload-Offset": str(resumable.current_offset(session.id))},
+                )
+            finally:
+                async with db_writer():
+                    session.updated_at = datetime.utcnow()
+                    await db.commit()
+    except resumable.SessionBusyError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Another request is writing to this upload")
     
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers={"Upload-Offset": str(offset)})
+
+
+@router.delete("/uploads/resumable/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_upload_session(
+    session_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Abandon a resumable upload and discard the bytes received
+    """
+    session = await _get_upload_session(db, session_id, current_user)
+    try:
+        with resumable.exclusive(session.id):
+            async with db_writer():
+                await db.delete(session)
+                await db.commit()
+            await run_in_threadpool(resumable.remove_session_file, session.id)
+    except resumable.SessionBusyError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Another request is writing to this upload")
+    return None
+
+
+@router.post(
+    "/uploads/resumable/{session_id}/finalize",
+    response_model=schemas.ReportResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def finalize_upload_session(
+    session_id: str,
+    report: schemas.ReportCreate,
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Create a report from a completed resumable upload
+    """
+    session = await _get_upload_session(db, session_id, current_user)
+    try:
+        with resumable.exclusive(session.id):
+            offset = resumable.current_offset(session.id)
+            if offset != session.size:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Upload incomplete: {offset} of {session.size} bytes received",
+                    headers={"Upload-Offset": str(offset)},
+                )
+            digest = await resumable.hash_session(session.id)
+            stored = StoredMedia(
+                path=content_path(settings.UPLOAD_DIR, digest, safe_extension(session.filename)),
+                sha256=digest,
+                size=session.size,
+                temp_path=resumable.session_file(session.id),
+            )
+            # The session file becomes the stored media (or is dropped as a duplicate)
+            db_report = await _save_report(db, request, current_user, stored, session.media_type, report)
+            async with db_writer():
+                await db.execute(delete(models.UploadSession).where(models.UploadSession.id == session_id))
+                await db.commit()
+    except resumable.SessionBusyError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Another request is writing to this upload")
+    
+    return db_report
+
+
+async def _get_upload_session(db: AsyncSession, session_id: str, current_user: CurrentUser) -> models.UploadSession:
+    """Load one of the current user's upload sessions or raise 404"""
+    session = await db.get(models.UploadSession, session_id)
+    if session is None or session.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    return session
+
+
+def _session_response(session: models.UploadSession, offset: int) -> schemas.UploadSessionResponse:
+    return schemas.UploadSessionResponse(
+        id=session.id,
+        offset=offset,
+        size=session.size,
+        expires_at=session.updated_at + timedelta(seconds=settings.RESUMABLE_SESSION_TTL_SECONDS),
+    )
+
+
+def _max_media_size(media_type: str) -> int:
+    """Upload size limit for a media type"""
+    return settings.MAX_IMAGE_SIZE if media_type == "image" else settings.MAX_VIDEO_SIZE
+
+
+def _media_too_large(media_type: str) -> HTTPException:
+    """Error returned when an upload exceeds its size limit"""
+    max_size = _max_media_size(media_type)
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"{media_type.capitalize()} size must not exceed {max_size / 1024 / 1024}MB"
+    )
+
+
+async def _save_report(
+    db: AsyncSession,
+    request: Request,
+    current_user: CurrentUser,
+    stored: StoredMedia,
+    media_type: str,
+    report: schemas.ReportCreate,
+) -> models.Report:
+    """Insert a report for stored media and queue its thumbnail"""
     # Get device info from User-Agent
     device_info = request.headers.get("user-agent", "Unknown")
     
     # Create report
-    db_report = models.Report(
+    db_report = models.Report(**_report_values(current_user, stored, media_type, report, device_info))
+    
+    # Identical media is stored once and shared through a reference count
+    async with db_writer():
+        db.add(db_report)
+        await db.flush()
+        await record_report_created(db, db_report)
+        try:
+            await acquire_blob(db, stored)
+        except InvalidUploadError as e:
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        await db.commit()
+        await db.refresh(db_report)
+    bump_data_version(current_user.id)
+    
+    # The original is durable; the thumbnail is rendered in the background
+    # (or picked up from disk when the same image was uploaded before)
+    if media_type == "image":
+        enqueue_thumbnail(db_report.id, stored.path)
+    
+    return db_report
+
+
+def _report_values(
+    current_user: CurrentUser,
+    stored: StoredMedia,
+    media_type: str,
+    report: schemas.ReportCreate,
+    device_info: str,
+) -> dict:
+    """Column values of a new report"""
+    return dict(
         user_id=current_user.id,
         media_type=media_type,
-        media_path=media_path,
-        thumbnail_path=thumbnail_path,
-        description=description,
-        behavior_rating=behavior_rating,
-        severity_index=severity_index,
-        latitude=latitude,
-        longitude=longitude,
+        media_path=stored.path,
+        thumbnail_status=THUMBNAIL_PENDING if media_type == "image" else None,
+        description=report.description,
+        behavior_rating=report.behavior_rating,
+        severity_index=report.severity_index,
+        latitude=report.latitude,
+        longitude=report.longitude,
+        geohash=(
+            encode_geohash(report.latitude, report.longitude)
+            if report.latitude is not None and report.longitude is not None else None
+        ),
         device_info=device_info,
-        camera_used=camera_used
+        camera_used=report.camera_used,
     )
-    
-    db.add(db_report)
-    db.commit()
-    db.refresh(db_report)
-    
-    return db_report
+
+
+def _validator_headers(etag: str) -> dict:
+    # Browsers keep the copy but revalidate it on every use
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def _cached_report_response(request: Request, user_id: int) -> Tuple[str, Hashable, Optional[Response]]:
+    """
+    Answer a report read from the user's data version when its page is
+    cached: 304 if the client's copy is current, else the cached page.
+    Only successful reads are cached, so a 304 never hides an error.
+    Returns (etag, cache key, response or None)
+    """
+    etag = data_etag(user_id)
+    key = page_key(request, user_id, etag)
+    page = cached_page(key)
+    if page is not None:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            PAGE_CACHE_REQUESTS.labels("not_modified").inc()
+            return etag, key, Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_validator_headers(etag))
+        PAGE_CACHE_REQUESTS.labels("hit").inc()
+        body, headers = page
+        return etag, key, Response(body, media_type="application/json", headers={**headers, **_validator_headers(etag)})
+    PAGE_CACHE_REQUESTS.labels("miss").inc()
+    return etag, key, None
+
+
+def _cache_report_response(etag: str, key: Hashable, content, headers: Optional[dict] = None) -> Response:
+    """Render report JSON, remember it under the data version and return it"""
+    response = ORJSONResponse(content, headers=headers)
+    store_page(key, response.body, headers or {})
+    response.headers.update(_validator_headers(etag))
+    return response
 
 
 @router.get("/", response_model=List[schemas.ReportResponse])
 async def list_reports(
+    request: Request,
     skip: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     limit: int = Query(10, ge=1, le=100),
-    sort_by: str = Query("created_at", regex="^(created_at|behavior_rating|severity_index)$"),
+    sort_by: str = Query("created_at", regex=f"^({'|'.join(SORT_COLUMNS)}|relevance)$"),
     sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    q: Optional[str] = Query(None, max_length=200),
+    filters: ReportFilters = Depends(),
+    geo: GeoFilter = Depends(),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    List reports with filtering, sorting, and pagination.
+    Pass the X-Next-Cursor header of a page as `cursor` to fetch the next one
+    without the cost of skipping rows; `skip` is ignored when a cursor is given.
+    Location can be restricted to a bounding box and/or a center + radius.
+    `q` searches descriptions (every word as a prefix) and adds a highlighted
+    `snippet`; `sort_by=relevance` ranks matches and pages with `skip` only.
+    Responses carry an ETag (304 on If-None-Match) and repeat requests are
+    served from a per-user cache until the user's reports change.
+    """
+    etag, cache_key, cached = _cached_report_response(request, current_user.id)
+    if cached is not None:
+        return cached
+    
+    by_relevance = sort_by == "relevance"
+    searching = bool(q and search_terms(q))
+    if by_relevance and not searching:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="sort_by=relevance requires q")
+    if by_relevance and cursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor pagination is not available when sorting by relevance"
+        )
+
+    query = report_columns_query(report_list_query(
+        current_user.id, filters, "created_at" if by_relevance else sort_by, sort_order,
+        narrowed=searching or geo.is_set(),
+    ))
+    try:
+        query = apply_geo_filter(query, geo, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if searching:
+        query, relevance = apply_search(query, q, db.get_bind().dialect.name)
+        if by_relevance and relevance is not None:
+            query = query.order_by(None).order_by(relevance, models.Report.id.desc())
+
+    # Apply pagination: keyset when a cursor is given, offset otherwise
+    if cursor:
+        try:
+            value, last_id = decode_cursor(cursor, sort_by, sort_order)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        key = tuple_(getattr(models.Report, sort_by), models.Report.id)
+        query = query.where(key < (value, last_id) if sort_order == "desc" else key > (value, last_id))
+    else:
+        query = query.offset(skip)
+
+    # Fetch one extra row to know whether a next page exists
+    rows = (await db.execute(query.limit(limit + 1))).all()
+
+    headers = {}
+    if not by_relevance:
+        next_cursor = next_cursor_for(rows, limit, sort_by, sort_order)
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+    
+    # Row tuples straight to orjson; the response model only documents the shape
+    return _cache_report_response(
+        etag,
+        cache_key,
+        [report_dict(row, row.snippet if searching else None) for row in rows[:limit]],
+        headers,
+    )
+
+
+@router.get("/stats", response_model=schemas.ReportStats)
+async def report_stats(
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None,
-    rating_min: Optional[int] = Query(None, ge=1, le=5),
-    rating_max: Optional[int] = Query(None, ge=1, le=5),
-    severity_min: Optional[int] = Query(None, ge=0, le=100),
-    severity_max: Optional[int] = Query(None, ge=0, le=100),
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Aggregate statistics for the current user's reports: total count, rating
+    distribution, severity histogram and daily time series.
+    Served from the daily rollup, so date filters apply at day granularity.
+    """
+    return await compute_stats(
+        db,
+        current_user.id,
+        date_from.date() if date_from else None,
+        date_to.date() if date_to else None,
+    )
+
+
+@router.get("/clusters", response_model=List[schemas.MapCluster])
+async def report_clusters(
+    zoom: int = Query(..., ge=0, le=20),
+    geo: GeoFilter = Depends(),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    List reports with filtering, sorting, and pagination
-    """
-    query = db.query(models.Report).filter(models.Report.user_id == current_user.id)
-
-    # Apply filters
-    if date_from:
-        query = query.filter(models.Report.created_at >= date_from)
-    if date_to:
-        query = query.filter(models.Report.created_at <= date_to)
-    
-    if rating_min is not None:
-        query = query.filter(models.Report.behavior_rating >= rating_min)
-    if rating_max is not None:
-        query = query.filter(models.Report.behavior_rating <= rating_max)
-        
-    if severity_min is not None:
-        query = query.filter(models.Report.severity_index >= severity_min)
-    if severity_max is not None:
-        query = query.filter(models.Report.severity_index <= severity_max)
-
-    # Apply sorting
-    sort_column = getattr(models.Report, sort_by)
-    if sort_order == "desc":
-        query = query.order_by(sort_column.desc())
+    Count the current user's geotagged reports per map cell for a zoom level.
+    Cells are geohash prefixes, so the grouping is an index range read over
+    (user_id, geohash); pass a bounding box to limit it to the visible map.
+    Cells are coarser than the zoom asks for when the area would otherwise
+    hold more than MAX_MAP_CLUSTERS of them, so high zooms need a bounding box.
+    """
+    try:
+        bbox = geo.bbox()
+        if geo.circle():
+            raise ValueError("Clusters accept a bounding box, not a radius")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    precision = cluster_precision(zoom, bbox, settings.MAX_MAP_CLUSTERS)
+    cell = func.substr(models.Report.geohash, 1, precision).label("cell")
+    query = select(
+        cell,
+        func.count().label("count"),
+        func.avg(models.Report.latitude).label("latitude"),
+        func.avg(models.Report.longitude).label("longitude"),
+    ).where(models.Report.geohash.is_not(None))
+    if bbox:
+        # The covering cells already select the user's reports by index
+        query = query.where(models.Report.user_id + 0 == current_user.id, geohash_cover(current_user.id, bbox))
     else:
-        query = query.order_by(sort_column.asc())
+        query = query.where(models.Report.user_id == current_user.id)
+    
+    result = await db.execute(query.group_by(cell))
+    return [
+        schemas.MapCluster(geohash=row.cell, count=row.count, latitude=row.latitude, longitude=row.longitude)
+        for row in result
+    ]
 
-    # Apply pagination
-    reports = query.offset(skip).limit(limit).all()
+
+@router.get("/export")
+async def export_reports(
+    format: str = Query("csv", regex=f"^({'|'.join(EXPORT_FORMATS)})$"),
+    include_media: bool = Query(False, alias="zip"),
+    sort_by: str = Query("created_at", regex=f"^({'|'.join(SORT_COLUMNS)})$"),
+    sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    q: Optional[str] = Query(None, max_length=200),
+    filters: ReportFilters = Depends(),
+    geo: GeoFilter = Depends(),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Export the current user's reports matching the list_reports filters as
+    CSV, NDJSON or Parquet. Rows are streamed from a server-side cursor, so
+    memory use does not grow with the number of reports. With `zip=true` the
+    file is bundled with the referenced media, also streamed.
+    """
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parquet export is not available on this server"
+        )
+    
+    searching = bool(q and search_terms(q))
+    query = export_query(report_list_query(
+        current_user.id, filters, sort_by, sort_order, narrowed=searching or geo.is_set()
+    ))
+    try:
+        query = apply_geo_filter(query, geo, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if searching:
+        query, _ = apply_search(query, q, db.get_bind().dialect.name)
     
-    return reports
+    filename = f"reports-{datetime.utcnow():%Y%m%d-%H%M%S}"
+    if include_media:
+        media_query = query.with_only_columns(models.Report.media_path).order_by(None).distinct()
+        return StreamingResponse(
+            stream_export_zip(query, media_query, format),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.zip"'},
+        )
+    return StreamingResponse(
+        stream_export(query, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
 
 
 @router.get("/{report_id}", response_model=schemas.ReportResponse)
 async def get_report(
     report_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Get a specific report by ID
+    Get a specific report by ID (ETag and cache as for list_reports)
     """
-    report = db.query(models.Report).filter(
-        models.Report.id == report_id,
-        models.Report.user_id == current_user.id
-    ).first()
+    etag, cache_key, cached = _cached_report_response(request, current_user.id)
+    if cached is not None:
+        return cached
     
-    if not report:
+    result = await db.execute(report_columns_query(report_by_id_query(current_user.id, report_id)))
+    row = result.first()
+    
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Report not found"
         )
     
-    return report
+    return _cache_report_response(etag, cache_key, report_dict(row))
 
 
 @router.delete("/{report_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_report(
     report_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a report
     """
-    report = db.query(models.Report).filter(
-        models.Report.id == report_id,
-        models.Report.user_id == current_user.id
-    ).first()
+    result = await db.execute(report_by_id_query(current_user.id, report_id))
+    report = result.scalar_one_or_none()
     
     if not report:
         raise HTTPException(
@@ -226,21 +812,13 @@ async def delete_report(
             detail="Report not found"
         )
     
-    # Delete media file
-    if os.path.exists(report.media_path):
-        try:
-            os.remove(report.media_path)
-        except OSError:
-            pass
-            
-    # Delete thumbnail if exists
-    if report.thumbnail_path and os.path.exists(report.thumbnail_path):
-        try:
-            os.remove(report.thumbnail_path)
-        except OSError:
-            pass
-    
-    db.delete(report)
-    db.commit()
+    # Releasing the last reference tombstones the media; the files are
+    # deleted by the background reaper, so this never waits on storage
+    async with db_writer():
+        await record_report_deleted(db, report)
+        await release_blob(db, report.media_path)
+        await db.delete(report)
+        await db.commit()
+    bump_data_version(current_user.id)
     
     return None
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, Field, validator
-from datetime import datetime
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, validator, computed_field
+from datetime import date, datetime
+from typing import Dict, List, Optional
 
 
 # User Schemas
@@ -44,12 +44,58 @@ class ReportCreate(BaseModel):
         return v
 
 
+class ReportFinalize(ReportCreate):
+    upload_token: str
+
+
+class BatchReportItem(ReportCreate):
+    # Retried batches with the same key return the existing report
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=64)
+
+
+# Direct Upload Schemas
+class UploadRequest(BaseModel):
+    filename: str = Field(..., max_length=255)
+    content_type: str = Field(..., max_length=100)
+    size: int = Field(..., gt=0)
+
+
+class DirectUploadRequest(UploadRequest):
+    sha256: str = Field(..., pattern="^[0-9a-f]{64}$")  # Hex digest of the file
+
+
+class UploadTicket(BaseModel):
+    upload_token: str  # Pass to POST /reports/finalize
+    already_stored: bool  # Identical media is already stored; skip the PUT
+    url: Optional[str] = None
+    method: str = "PUT"
+    headers: Dict[str, str] = {}
+    expires_at: datetime
+
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    offset: int  # Bytes received so far; PATCH the next chunk at this offset
+    size: int
+    expires_at: datetime  # If no chunk arrives before then
+
+
+class Rendition(BaseModel):
+    name: str
+    width: int
+    height: int
+    format: str
+    path: str
+
+
 class ReportResponse(BaseModel):
     id: int
     user_id: int
     media_type: str
     media_path: str
     thumbnail_path: Optional[str] = None
+    thumbnail_status: Optional[str] = None
+    renditions: Optional[List[Rendition]] = None
     description: str
     behavior_rating: int
     severity_index: int
@@ -58,11 +104,54 @@ class ReportResponse(BaseModel):
     device_info: Optional[str]
     camera_used: Optional[str]
     created_at: datetime
+    snippet: Optional[str] = None  # Highlighted match, only when searching
+    
+    @computed_field
+    @property
+    def srcset(self) -> Optional[str]:
+        """Renditions as an HTML srcset value (paths relative to the API root)"""
+        if not self.renditions:
+            return None
+        return ", ".join(f"{r.path} {r.width}w" for r in self.renditions)
     
     class Config:
         from_attributes = True
 
 
+class BatchItemResult(BaseModel):
+    index: int  # Position of the item in the batch
+    status: str  # 'created', 'duplicate' or 'error'
+    report: Optional[ReportResponse] = None
+    detail: Optional[str] = None
+
+
+# Statistics Schemas
+class SeverityBucket(BaseModel):
+    severity_min: int
+    severity_max: int
+    count: int
+
+
+class DailyCount(BaseModel):
+    day: date
+    count: int
+
+
+class ReportStats(BaseModel):
+    total_reports: int
+    rating_distribution: Dict[int, int]
+    severity_histogram: List[SeverityBucket]
+    daily: List[DailyCount]
+
+
+# Map Schemas
+class MapCluster(BaseModel):
+    geohash: str
+    count: int
+    latitude: float
+    longitude: float
+
+
 # Contact Schema
 class ContactMessage(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
@@ -0,0 +1,111 @@
+import logging
+import re
+from typing import List, Optional, Tuple
+from sqlalchemy import Select, column, func, literal_column, table, text
+from .config import settings
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# External-content FTS5 index over reports.description (SQLite)
+reports_fts = table("reports_fts", column("rowid"))
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+
+
+def search_terms(q: str) -> List[str]:
+    """Split a user query into word tokens; punctuation and operators are dropped"""
+    return _TOKEN.findall(q)[:16]
+
+
+def install_search(conn) -> None:
+    """
+    Create the full-text index and keep it in sync with reports.
+    SQLite: an FTS5 table with insert/update/delete triggers.
+    PostgreSQL: a generated tsvector column with a GIN index.
+    Idempotent; the index is (re)built when first created.
+    """
+    if conn.dialect.name == "sqlite":
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'reports_fts'")
+        ).first()
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5("
+            "description, content='reports', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS reports_fts_insert AFTER INSERT ON reports BEGIN "
+            "INSERT INTO reports_fts(rowid, description) VALUES (new.id, new.description); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS reports_fts_delete AFTER DELETE ON reports BEGIN "
+            "INSERT INTO reports_fts(reports_fts, rowid, description) "
+            "VALUES ('delete', old.id, old.description); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS reports_fts_update AFTER UPDATE OF description ON reports BEGIN "
+            "INSERT INTO reports_fts(reports_fts, rowid, description) "
+            "VALUES ('delete', old.id, old.description); "
+            "INSERT INTO reports_fts(rowid, description) VALUES (new.id, new.description); END"
+        ))
+        if not exists:
+            logger.info("Building reports_fts full-text index")
+            conn.execute(text("INSERT INTO reports_fts(reports_fts) VALUES ('rebuild')"))
+
+    elif conn.dialect.name == "postgresql":
+        language = settings.SEARCH_LANGUAGE
+        conn.execute(text(
+            "ALTER TABLE reports ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('{language}', coalesce(description, ''))) STORED"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_reports_search_vector ON reports USING GIN (search_vector)"
+        ))
+
+
+def apply_search(stmt: Select, q: str, dialect: str) -> Tuple[Select, Optional[object]]:
+    """
+    Restrict a statement over reports to those matching q, with every term
+    matched as a prefix. Adds a highlighted snippet as a second column and
+    returns (statement, relevance ordering), or (stmt, None) when q holds no
+    searchable terms or the database has no full-text support.
+
+    Build stmt with report_list_query(narrowed=True): the matches are then
+    the candidate set, read from the full-text index first and sorted on
+    their own, instead of the planner walking the user's sort index and
+    probing the index once per report.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return stmt, None
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        snippet = func.snippet(literal_column("reports_fts"), 0, SNIPPET_START, SNIPPET_END, "…", 16)
+        stmt = (
+            stmt.join(reports_fts, reports_fts.c.rowid == models.Report.id)
+            .where(literal_column("reports_fts").op("MATCH")(match))
+            .add_columns(snippet.label("snippet"))
+        )
+        # FTS5 rank is bm25, where lower means more relevant
+        return stmt, literal_column("reports_fts.rank").asc()
+
+    if dialect == "postgresql":
+        language = settings.SEARCH_LANGUAGE
+        tsquery = func.to_tsquery(language, " & ".join(f"{term}:*" for term in terms))
+        vector = literal_column("reports.search_vector")
+        snippet = func.ts_headline(
+            language, models.Report.description, tsquery,
+            f"StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxFragments=1, MaxWords=16, MinWords=4",
+        )
+        stmt = stmt.where(vector.op("@@")(tsquery)).add_columns(snippet.label("snippet"))
+        return stmt, func.ts_rank_cd(vector, tsquery).desc()
+
+    # No full-text index: fall back to a substring match per term
+    for term in terms:
+        stmt = stmt.where(models.Report.description.ilike(f"%{term}%"))
+    return stmt.add_columns(literal_column("NULL").label("snippet")), None
@@ -0,0 +1,70 @@
+from typing import Optional, Sequence
+
+from sqlalchemy import Select
+
+from . import models
+
+# Read path for report responses: the statement selects exactly the columns
+# of schemas.ReportResponse and each row tuple is turned into a plain dict
+# that orjson encodes (fastapi.responses.ORJSONResponse). No ORM instances
+# are built and no pydantic validation runs, while the JSON is the same as
+# what response_model=ReportResponse produced.
+
+REPORT_COLUMNS = (
+    models.Report.id,
+    models.Report.user_id,
+    models.Report.media_type,
+    models.Report.media_path,
+    models.Report.thumbnail_path,
+    models.Report.thumbnail_status,
+    models.Report.renditions,
+    models.Report.description,
+    models.Report.behavior_rating,
+    models.Report.severity_index,
+    models.Report.latitude,
+    models.Report.longitude,
+    models.Report.device_info,
+    models.Report.camera_used,
+    models.Report.created_at,
+)
+
+_RENDITION_FIELDS = ("name", "width", "height", "format", "path")
+
+
+def report_columns_query(stmt: Select) -> Select:
+    """Narrow a report query to the response columns, keeping its filters and order"""
+    return stmt.with_only_columns(*REPORT_COLUMNS)
+
+
+def report_dict(row: Sequence, snippet: Optional[str] = None) -> dict:
+    """Build the ReportResponse JSON object for a row of report_columns_query"""
+    (
+        report_id, user_id, media_type, media_path, thumbnail_path, thumbnail_status, renditions,
+        description, behavior_rating, severity_index, latitude, longitude, device_info,
+        camera_used, created_at,
+    ) = row[:len(REPORT_COLUMNS)]
+
+    srcset = None
+    if renditions:
+        renditions = [{field: r[field] for field in _RENDITION_FIELDS} for r in renditions]
+        srcset = ", ".join(f"{r['path']} {r['width']}w" for r in renditions)
+
+    return {
+        "id": report_id,
+        "user_id": user_id,
+        "media_type": media_type,
+        "media_path": media_path,
+        "thumbnail_path": thumbnail_path,
+        "thumbnail_status": thumbnail_status,
+        "renditions": renditions,
+        "description": description,
+        "behavior_rating": behavior_rating,
+        "severity_index": severity_index,
+        "latitude": latitude,
+        "longitude": longitude,
+        "device_info": device_info,
+        "camera_used": camera_used,
+        "created_at": created_at,
+        "snippet": snippet,
+        "srcset": srcset,
+    }
@@ -0,0 +1,125 @@
+from collections import defaultdict
+from datetime import date
+from typing import Optional
+from sqlalchemy import Date, case, cast, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, schemas
+
+SEVERITY_BUCKETS = 10
+
+
+def severity_bucket(severity_index: int) -> int:
+    """Map a 0-100 severity to one of ten buckets (90-100 share the last one)"""
+    return min(severity_index // 10, SEVERITY_BUCKETS - 1)
+
+
+def _rollup_key(report: models.Report) -> dict:
+    return {
+        "user_id": report.user_id,
+        "day": report.created_at.date(),
+        "behavior_rating": report.behavior_rating,
+        "severity_bucket": severity_bucket(report.severity_index),
+    }
+
+
+async def record_report_created(db: AsyncSession, report: models.Report) -> None:
+    """Count a new report in its rollup bucket, inside the caller's transaction"""
+    table = models.ReportDailyStat.__table__
+    key = _rollup_key(report)
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = dialect_insert(table).values(**key, report_count=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={"report_count": table.c.report_count + 1},
+        )
+        await db.execute(stmt)
+        return
+
+    # Portable fallback: update, then insert if no bucket existed yet
+    result = await db.execute(
+        update(table).where(*(table.c[k] == v for k, v in key.items()))
+        .values(report_count=table.c.report_count + 1)
+    )
+    if result.rowcount == 0:
+        await db.execute(insert(table).values(**key, report_count=1))
+
+
+async def record_report_deleted(db: AsyncSession, report: models.Report) -> None:
+    """Uncount a deleted report, dropping its bucket once it is empty"""
+    table = models.ReportDailyStat.__table__
+    match = [table.c[k] == v for k, v in _rollup_key(report).items()]
+    await db.execute(update(table).where(*match).values(report_count=table.c.report_count - 1))
+    await db.execute(delete(table).where(*match, table.c.report_count <= 0))
+
+
+async def compute_stats(
+    db: AsyncSession,
+    user_id: int,
+    day_from: Optional[date] = None,
+    day_to: Optional[date] = None,
+) -> schemas.ReportStats:
+    """
+    Aggregate a user's statistics from the rollup table. Cost is proportional
+    to the number of (day, rating, severity bucket) cells, not to reports.
+    """
+    stat = models.ReportDailyStat
+    stmt = select(stat.day, stat.behavior_rating, stat.severity_bucket, stat.report_count).where(
+        stat.user_id == user_id
+    )
+    if day_from:
+        stmt = stmt.where(stat.day >= day_from)
+    if day_to:
+        stmt = stmt.where(stat.day <= day_to)
+
+    total = 0
+    ratings = {rating: 0 for rating in range(1, 6)}
+    buckets = [0] * SEVERITY_BUCKETS
+    daily = defaultdict(int)
+    for day, rating, bucket, count in (await db.execute(stmt)).all():
+        total += count
+        ratings[rating] = ratings.get(rating, 0) + count
+        buckets[bucket] += count
+        daily[day] += count
+
+    return schemas.ReportStats(
+        total_reports=total,
+        rating_distribution=ratings,
+        severity_histogram=[
+            schemas.SeverityBucket(
+                severity_min=i * 10,
+                severity_max=100 if i == SEVERITY_BUCKETS - 1 else i * 10 + 9,
+                count=count,
+            )
+            for i, count in enumerate(buckets)
+        ],
+        daily=[schemas.DailyCount(day=day, count=daily[day]) for day in sorted(daily)],
+    )
+
+
+def rebuild_rollups(conn) -> None:
+    """
+    Recompute the whole rollup table from reports (used to backfill databases
+    created before the rollup existed). Runs on a synchronous connection.
+    """
+    report = models.Report
+    table = models.ReportDailyStat.__table__
+    if conn.dialect.name == "sqlite":
+        day = func.date(report.created_at)
+    else:
+        day = cast(report.created_at, Date)
+    bucket = case(
+        (report.severity_index >= 100, SEVERITY_BUCKETS - 1),
+        else_=report.severity_index // 10,
+    )
+    rows = select(
+        report.user_id, day, report.behavior_rating, bucket, func.count()
+    ).group_by(report.user_id, day, report.behavior_rating, bucket)
+
+    conn.execute(delete(table))
+    conn.execute(insert(table).from_select(
+        ["user_id", "day", "behavior_rating", "severity_bucket", "report_count"], rows
+    ))
@@ -0,0 +1,223 @@
+import abc
+import base64
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from jose import JWTError, jwt
+
+from .config import settings
+
+# Storage keys are forward-slash paths such as "uploads/ab/cd/<sha256>.jpg".
+# The local driver uses them as paths relative to the working directory, so
+# keys and the media_path values stored before drivers existed are the same.
+
+
+class Storage(abc.ABC):
+    """
+    Where media bytes live. Methods are blocking; call them from a thread
+    (run_in_threadpool) or a worker process.
+    """
+    is_local = False
+
+    @abc.abstractmethod
+    def save(self, local_path: str, key: str, content_type: Optional[str] = None) -> None:
+        """Move a finished local file to key, replacing any existing object"""
+
+    @abc.abstractmethod
+    def size(self, key: str) -> Optional[int]:
+        """Return the size of the object at key, or None if there is none"""
+
+    def exists(self, key: str) -> bool:
+        return self.size(key) is not None
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete the object at key; missing objects are ignored"""
+
+    @abc.abstractmethod
+    def iter_objects(self, prefix: str) -> Iterator[Tuple[str, int, float]]:
+        """Yield (key, size, modified as a Unix timestamp) for every object under prefix"""
+
+    @abc.abstractmethod
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[str]:
+        """Yield a local filesystem path holding the object's bytes"""
+
+    @abc.abstractmethod
+    def presign_put(
+        self, key: str, content_type: str, size: int, sha256: str, expires_in: int
+    ) -> Tuple[str, Dict[str, str]]:
+        """
+        Return (url, headers) for a client to PUT exactly these bytes to key.
+        The storage rejects a body whose length or SHA-256 does not match.
+        """
+
+    def presign_get(self, key: str, expires_in: int) -> Optional[str]:
+        """Return a time-limited download URL, or None if the API serves the bytes"""
+        return None
+
+
+class LocalStorage(Storage):
+    """Files on the API host's disk, served by the media router (or nginx)"""
+    is_local = True
+
+    def save(self, local_path: str, key: str, content_type: Optional[str] = None) -> None:
+        os.makedirs(os.path.dirname(key) or ".", exist_ok=True)
+        os.replace(local_path, key)
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return os.stat(key).st_size
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(key)
+        except FileNotFoundError:
+            pass
+
+    def iter_objects(self, prefix: str) -> Iterator[Tuple[str, int, float]]:
+        for root, _, files in os.walk(prefix):
+            for name in files:
+                key = Path(root, name).as_posix()
+                try:
+                    stat = os.stat(key)
+                except FileNotFoundError:
+                    continue
+                yield key, stat.st_size, stat.st_mtime
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[str]:
+        yield key
+
+    def presign_put(
+        self, key: str, content_type: str, size: int, sha256: str, expires_in: int
+    ) -> Tuple[str, Dict[str, str]]:
+        # There is no separate storage service: the client PUTs to the media
+        # router, which checks length and hash against the signed claims.
+        claims = {
+            "typ": "put",
+            "key": key,
+            "size": size,
+            "sha256": sha256,
+            "exp": datetime.utcnow() + timedelta(seconds=expires_in),
+        }
+        token = jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        return f"/uploads/direct/{token}", {"Content-Type": content_type}
+
+    @staticmethod
+    def verify_put(token: str) -> Optional[dict]:
+        """Return the claims of a presigned PUT token, or None if invalid or expired"""
+        try:
+            claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            return None
+        return claims if claims.get("typ") == "put" else None
+
+
+class S3Storage(Storage):
+    """
+    An S3-compatible bucket (AWS S3, MinIO, Garage, ...). Clients upload and
+    download directly with presigned URLs, so no media bytes pass through the
+    API workers on that path.
+    """
+
+    def __init__(self):
+        try:
+            import boto3
+            from botocore.config import Config
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+        self._client_error = ClientError
+        self.bucket = settings.S3_BUCKET
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            config=Config(
+                signature_version="s3v4",
+                # MinIO and most self-hosted stores want path-style URLs
+                s3={"addressing_style": "path" if settings.S3_ENDPOINT_URL else "auto"},
+            ),
+        )
+
+    def save(self, local_path: str, key: str, content_type: Optional[str] = None) -> None:
+        extra = {"ContentType": content_type} if content_type else {}
+        self.client.upload_file(local_path, self.bucket, key, ExtraArgs=extra)
+        os.remove(local_path)
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)["ContentLength"]
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def iter_objects(self, prefix: str) -> Iterator[Tuple[str, int, float]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield obj["Key"], obj["Size"], obj["LastModified"].timestamp()
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[str]:
+        directory = tempfile.mkdtemp(prefix="media-")
+        path = os.path.join(directory, os.path.basename(key))
+        try:
+            self.client.download_file(self.bucket, key, path)
+            yield path
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def presign_put(
+        self, key: str, content_type: str, size: int, sha256: str, expires_in: int
+    ) -> Tuple[str, Dict[str, str]]:
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        url = self.client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ContentType": content_type,
+                "ContentLength": size,
+                "ChecksumSHA256": checksum,
+            },
+            ExpiresIn=expires_in,
+        )
+        return url, {"Content-Type": content_type, "x-amz-checksum-sha256": checksum}
+
+    def presign_get(self, key: str, expires_in: int) -> Optional[str]:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ResponseCacheControl": f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable",
+            },
+            ExpiresIn=expires_in,
+        )
+
+
+@lru_cache(maxsize=1)
+def get_storage() -> Storage:
+    """Return the configured storage driver (one per process)"""
+    backend = settings.STORAGE_BACKEND.lower()
+    if backend == "local":
+        return LocalStorage()
+    if backend == "s3":
+        return S3Storage()
+    raise RuntimeError(f"Unknown STORAGE_BACKEND {settings.STORAGE_BACKEND!r}")
@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from PIL import Image, features
+from sqlalchemy import select
+
+from .config import settings
+from .database import AsyncSessionLocal, db_writer
+from .metrics import THUMBNAIL_DURATION
+from .page_cache import bump_data_version
+from .storage import get_storage
+from . import media, models
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_PENDING = "pending"
+THUMBNAIL_READY = "ready"
+THUMBNAIL_FAILED = "failed"
+
+FORMAT_EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+# Pending jobs are requeued this long after a broken pool is replaced, so an
+# image that kills its worker every time cannot keep the pool restarting
+_REQUEUE_DELAY_SECONDS = 60
+_requeues: Set[asyncio.Task] = set()
+
+
+def rendition_format() -> str:
+    """Return the Pillow format renditions are encoded in"""
+    fmt = settings.RENDITION_FORMAT.upper()
+    if fmt == "WEBP" and not features.check("webp"):
+        # Pillow built without libwebp: fall back to JPEG
+        return "JPEG"
+    return fmt
+
+
+def _save_atomic(img: Image.Image, path: str, fmt: str, quality: int) -> None:
+    """Write an image through a temp file so readers never see a partial file"""
+    directory, name = os.path.split(path)
+    # Unique per writer: two jobs may render the same shared media at once
+    temp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.part")
+    img.save(temp_path, fmt, quality=quality)
+    os.replace(temp_path, path)
+
+
+def _existing_renditions(stem: str, thumb_path: str, sizes: Dict[str, int], extension: str, fmt: str) -> Optional[List[dict]]:
+    """Describe renditions already rendered for this content, or None if any is missing"""
+    paths = {name: f"{stem}_{name}.{extension}" for name in sizes}
+    if not os.path.exists(thumb_path) or not all(os.path.exists(p) for p in paths.values()):
+        return None
+    renditions = []
+    for name, size in sorted(sizes.items(), key=lambda item: item[1]):
+        with Image.open(paths[name]) as img:
+            renditions.append({
+                "name": name,
+                "width": img.width,
+                "height": img.height,
+                "format": fmt.lower(),
+                "path": Path(paths[name]).as_posix(),
+            })
+    return renditions
+
+
+def render_renditions(
+    file_path: str, thumb_path: str, sizes: Dict[str, int], fmt: str, quality: int
+) -> Tuple[str, List[dict]]:
+    """
+    Render the configured image renditions plus a JPEG thumbnail fallback.
+    Runs inside a worker process.
+
+    Media files are content-addressed, so renditions already on disk for the
+    same file are reused instead of rendered again. JPEGs are decoded with
+    Image.draft so the decoder scales down by a power of two while decoding,
+    instead of inflating the full camera resolution. Renditions are produced
+    largest first, each one downscaled from the last.
+    """
+    stem = os.path.splitext(file_path)[0]
+    extension = FORMAT_EXTENSIONS.get(fmt, fmt.lower())
+
+    existing = _existing_renditions(stem, thumb_path, sizes, extension, fmt)
+    if existing is not None:
+        return Path(thumb_path).as_posix(), existing
+
+    renditions = []
+    with Image.open(file_path) as img:
+        largest = max(sizes.values())
+        if img.format == "JPEG":
+            img.draft("RGB", (largest, largest))
+
+        # Convert to RGB if necessary (e.g. for palette PNGs)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        else:
+            img.load()
+
+        for name, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+            img.thumbnail((size, size))
+            out = img if fmt != "JPEG" or img.mode == "RGB" else img.convert("RGB")
+            path = f"{stem}_{name}.{extension}"
+            _save_atomic(out, path, fmt, quality)
+            renditions.append({
+                "name": name,
+                "width": out.width,
+                "height": out.height,
+                "format": fmt.lower(),
+                "path": Path(path).as_posix(),
+            })
+
+        # JPEG thumbnail for clients that cannot decode the rendition format
+        img.thumbnail((sizes.get("thumb", 300), sizes.get("thumb", 300)))
+        _save_atomic(img.convert("RGB"), thumb_path, "JPEG", 85)
+
+    renditions.reverse()
+    # Normalize path to use forward slashes
+    return Path(thumb_path).as_posix(), renditions
+
+
+def render_stored_renditions(
+    file_path: str, thumb_path: str, sizes: Dict[str, int], fmt: str, quality: int
+) -> Tuple[str, List[dict]]:
+    """
+    render_renditions for a storage key. Remote objects are downloaded to a
+    temp directory, rendered there and the results uploaded next to the
+    original. Runs inside a worker process.
+    """
+    storage = get_storage()
+    if storage.is_local:
+        return render_renditions(file_path, thumb_path, sizes, fmt, quality)
+
+    stem = os.path.splitext(file_path)[0]
+    with storage.local_copy(file_path) as local_path:
+        local_thumb, renditions = render_renditions(
+            local_path, thumbnail_path_for(local_path), sizes, fmt, quality
+        )
+        storage.save(local_thumb, thumb_path, "image/jpeg")
+        for rendition in renditions:
+            key = f"{stem}_{rendition['name']}{os.path.splitext(rendition['path'])[1]}"
+            storage.save(rendition["path"], key, f"image/{rendition['format']}")
+            rendition["path"] = key
+    return Path(thumb_path).as_posix(), renditions
+
+
+def thumbnail_path_for(file_path: str) -> str:
+    """Return where the JPEG thumbnail of a media file is stored (next to it)"""
+    return os.path.join(os.path.dirname(file_path), f"thumb_{os.path.basename(file_path)}")
+
+
+def rendition_paths(media_path: str) -> List[str]:
+    """Return every derivative file that may exist for a media file"""
+    stem = os.path.splitext(media_path)[0]
+    paths = [thumbnail_path_for(media_path)]
+    for name in settings.IMAGE_RENDITIONS:
+        for extension in set(FORMAT_EXTENSIONS.values()):
+            paths.append(f"{stem}_{name}.{extension}")
+    return paths
+
+
+def start_worker_pool() -> None:
+    """Start the thumbnail process pool"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS)
+
+
+def shutdown_worker_pool() -> None:
+    """Stop the thumbnail process pool, waiting for running jobs"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def _restart_worker_pool(broken: ProcessPoolExecutor) -> None:
+    """Replace a pool that lost a worker (e.g. OOM-killed) and requeue the pending jobs"""
+    global _executor
+    if _executor is not broken:
+        return  # Already replaced
+    _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+    start_worker_pool()
+    task = asyncio.get_running_loop().create_task(requeue_pending_thumbnails(_REQUEUE_DELAY_SECONDS))
+    _requeues.add(task)
+    task.add_done_callback(_requeues.discard)
+
+
+def enqueue_thumbnail(report_id: int, file_path: str) -> None:
+    """
+    Queue rendition generation for a report whose original file is durable.
+    The report row is updated to ready/failed when the job completes. Never
+    raises: callers have already committed the report, which stays pending
+    when the job cannot be queued and is requeued on a fresh pool.
+    """
+    start_worker_pool()
+    executor = _executor
+    thumb_path = thumbnail_path_for(file_path)
+    queued = time.perf_counter()
+    try:
+        future = executor.submit(
+            render_stored_renditions,
+            file_path,
+            thumb_path,
+            dict(settings.IMAGE_RENDITIONS),
+            rendition_format(),
+            settings.RENDITION_QUALITY,
+        )
+    except Exception as e:
+        logger.error(f"Could not queue thumbnail for report {report_id}, restarting the worker pool: {e}")
+        _restart_worker_pool(executor)
+        return
+    loop = asyncio.get_running_loop()
+    future.add_done_callback(lambda f: _job_done(loop, executor, report_id, file_path, f, queued))
+
+
+async def requeue_pending_thumbnails(delay: float = 0) -> None:
+    """Resubmit jobs still pending after a restart of the process or of a broken pool"""
+    await asyncio.sleep(delay)
+    async with AsyncSessionLocal() as db:
+        pending = (await db.execute(
+            select(models.Report.id, models.Report.media_path)
+            .where(models.Report.thumbnail_status == THUMBNAIL_PENDING)
+        )).all()
+
+    for report_id, media_path in pending:
+        enqueue_thumbnail(report_id, media_path)
+
+
+def _job_done(
+    loop: asyncio.AbstractEventLoop, executor: ProcessPoolExecutor,
+    report_id: int, file_path: str, future: Future, queued: float,
+) -> None:
+    """Hand a finished job to the event loop, where writes go through db_writer"""
+    try:
+        asyncio.run_coroutine_threadsafe(_record_result(executor, report_id, file_path, future, queued), loop)
+    except RuntimeError:
+        # The loop is gone (shutdown): the report stays pending and is requeued on start
+        pass
+
+
+async def _record_result(
+    executor: ProcessPoolExecutor, report_id: int, file_path: str, future: Future, queued: float
+) -> None:
+    """Store the outcome of a thumbnail job on its report"""
+    thumbnail_path = None
+    renditions = None
+    status = THUMBNAIL_READY
+    try:
+        thumbnail_path, renditions = future.result()
+    except BrokenProcessPool as e:
+        # The worker died, not the image: keep the report pending for the new pool
+        logger.error(f"Thumbnail worker died while rendering report {report_id}: {e}")
+        _restart_worker_pool(executor)
+        return
+    except Exception as e:
+        logger.warning(f"Error generating thumbnail for report {report_id}: {e}")
+        status = THUMBNAIL_FAILED
+    THUMBNAIL_DURATION.labels(status).observe(time.perf_counter() - queued)
+
+    try:
+        async with AsyncSessionLocal() as db:
+            async with db_writer():
+                report = await db.get(models.Report, report_id)
+                if report is None:
+                    # Report was deleted while the job was running: leave what
+                    # was rendered to the media reaper, unless other reports
+                    # still share the same media
+                    await media.tombstone_media(db, file_path)
+                    await db.commit()
+                    return
+                report.thumbnail_path = thumbnail_path
+                report.renditions = renditions
+                report.thumbnail_status = status
+                user_id = report.user_id
+                await db.commit()
+        bump_data_version(user_id)
+    except Exception as e:
+        logger.error(f"Could not record thumbnail for report {report_id}: {e}")
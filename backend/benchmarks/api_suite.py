@@ -0,0 +1,278 @@
+"""
+API benchmark suite: throughput and latency of the main endpoints.
+
+Runs in-process against the ASGI app through httpx's ASGI transport, so
+results measure the application (routing, validation, DB, serialization)
+without network noise. A user is seeded with --reports reports (see
+benchmarks.seed), then each scenario sends --requests requests from
+--concurrency concurrent clients:
+
+    login                     POST /auth/login
+    get_report                GET /reports/{id} for random ids
+    list_reports skip=N       GET /reports/?skip=N for each --offsets value
+    list_reports cursor       GET /reports/ following X-Next-Cursor page after page
+    create_report image       POST /reports/ with a --image-px JPEG
+    create_report video       POST /reports/ with a --video-mb video
+
+Every uploaded file is unique, so content deduplication does not flatter
+the create numbers. Results are written as JSON (--output) and can be
+compared with an earlier run (--compare) to spot regressions between commits.
+
+Uses a temporary SQLite database and upload directory unless DATABASE_URL
+is set; an existing database is reused and topped up to the requested volume.
+
+    python -m benchmarks.api_suite --reports 100000 --output bench.json
+    python -m benchmarks.api_suite --reports 100000 --compare bench.json
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+# Settings are read when the app is first imported, so this must come first
+WORKDIR = None
+if "DATABASE_URL" not in os.environ:
+    WORKDIR = tempfile.mkdtemp(prefix="api-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+    os.environ.setdefault("UPLOAD_DIR", os.path.join(WORKDIR, "uploads"))
+
+# Repeated reads would otherwise be answered by the page cache; set
+# PAGE_CACHE_MAX_BYTES explicitly to benchmark with it
+os.environ.setdefault("PAGE_CACHE_MAX_BYTES", "0")
+# Measure throughput, not the per-user upload rate limit
+os.environ.setdefault("UPLOAD_RATE_PER_MINUTE", "0")
+
+import httpx  # noqa: E402
+from benchmarks.sqlite_writes import percentile  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+SCENARIOS = ("login", "get_report", "list_reports", "create_report")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_image(pixels: int) -> bytes:
+    """A noisy JPEG (noise keeps it from compressing to nothing) of about `pixels` on the long edge"""
+    from PIL import Image
+
+    width, height = pixels, pixels * 3 // 4
+    image = Image.effect_noise((width, height), 40).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+async def measure(
+    name: str, call: Callable[[int], Awaitable[httpx.Response]], requests: int, concurrency: int
+) -> dict:
+    """Send `requests` calls from `concurrency` workers and summarize their latency"""
+    latencies: List[float] = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            started = time.perf_counter()
+            response = await call(i)
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "name": name,
+        "requests": requests,
+        "errors": errors,
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0) * 1000, 2),
+    }
+
+
+async def wait_for_thumbnails(engine, timeout: float = 300) -> None:
+    """Wait until no report has a rendition job pending"""
+    from app import models, thumbnails
+    from sqlalchemy import func, select
+
+    query = select(func.count()).select_from(models.Report).where(
+        models.Report.thumbnail_status == thumbnails.THUMBNAIL_PENDING
+    )
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        with engine.connect() as conn:
+            if not conn.execute(query).scalar_one():
+                return
+        await asyncio.sleep(0.2)
+
+
+async def run_suite(args) -> dict:
+    from app.config import settings
+    from app.database import engine
+    from app.main import app
+    from app import models, thumbnails
+    from benchmarks.seed import PASSWORD, seed_database, user_email
+    from sqlalchemy import select
+
+    started = time.perf_counter()
+    user_id = seed_database(engine, 1, args.reports, seed=args.seed)[0]
+    seed_seconds = time.perf_counter() - started
+    with engine.connect() as conn:
+        report_ids = conn.execute(
+            select(models.Report.id).where(models.Report.user_id == user_id)
+        ).scalars().all()
+
+    rng = random.Random(args.seed)
+    image = make_image(args.image_px)
+    video = rng.randbytes(args.video_mb * 1024 * 1024)
+    results = []
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        credentials = {"username": user_email(0), "password": PASSWORD}
+        response = await client.post("/auth/login", data=credentials)
+        response.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+        async def run(name, call, requests=args.requests, concurrency=args.concurrency):
+            for i in range(min(args.warmup, requests)):
+                await call(i)
+            result = await measure(name, call, requests, concurrency)
+            results.append(result)
+            print(
+                f"{name:<28} {result['requests_per_sec']:>9} req/s  p50 {result['p50_ms']:>8}ms  "
+                f"p99 {result['p99_ms']:>8}ms  errors {result['errors']}"
+            )
+
+        if "login" in args.scenarios:
+            await run("login", lambda i: client.post("/auth/login", data=credentials))
+
+        if "get_report" in args.scenarios:
+            await run("get_report", lambda i: client.get(f"/reports/{rng.choice(report_ids)}"))
+
+        if "list_reports" in args.scenarios:
+            for offset in args.offsets:
+                if offset >= len(report_ids):
+                    continue
+                await run(
+                    f"list_reports skip={offset}",
+                    lambda i, offset=offset: client.get("/reports/", params={"skip": offset, "limit": args.page_size}),
+                )
+
+            next_cursor = None
+
+            async def cursor_page(i):
+                nonlocal next_cursor
+                params = {"limit": args.page_size}
+                if next_cursor:
+                    params["cursor"] = next_cursor
+                response = await client.get("/reports/", params=params)
+                next_cursor = response.headers.get("x-next-cursor")
+                return response
+
+            # Sequential by nature: each page needs the previous page's cursor
+            await run("list_reports cursor", cursor_page, concurrency=1)
+
+        if "create_report" in args.scenarios:
+            def create(data: bytes, filename: str, content_type: str):
+                async def call(i):
+                    # A unique suffix gives every upload its own content hash
+                    body = data + f"{time.time_ns()}-{i}".encode()
+                    return await client.post(
+                        "/reports/",
+                        data={"description": "benchmark upload", "behavior_rating": 3, "severity_index": 50},
+                        files={"media": (filename, body, content_type)},
+                    )
+                return call
+
+            await run("create_report image", create(image, "bench.jpg", "image/jpeg"), args.upload_requests)
+            # Let rendition jobs finish so they do not load the next scenario
+            await wait_for_thumbnails(engine)
+            await run("create_report video", create(video, "bench.mp4", "video/mp4"), args.upload_requests)
+
+    thumbnails.shutdown_worker_pool()
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "reports": len(report_ids),
+            "seed_seconds": round(seed_seconds, 1),
+            "concurrency": args.concurrency,
+            "image_bytes": len(image),
+            "video_bytes": len(video),
+            "max_image_size": settings.MAX_IMAGE_SIZE,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict) -> None:
+    """Print throughput and p99 changes for scenarios present in both runs"""
+    before = {r["name"]: r for r in baseline["results"]}
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for r in current["results"]:
+        old = before.get(r["name"])
+        if old is None:
+            continue
+        rps = (r["requests_per_sec"] / old["requests_per_sec"] - 1) * 100 if old["requests_per_sec"] else 0
+        p99 = (r["p99_ms"] / old["p99_ms"] - 1) * 100 if old["p99_ms"] else 0
+        print(f"{r['name']:<28} throughput {rps:+7.1f}%   p99 {p99:+7.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=10000, help="Reports seeded for the benchmark user")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per read/login scenario")
+    parser.add_argument("--upload-requests", type=int, default=20, help="Requests per upload scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before each scenario")
+    parser.add_argument("--offsets", type=int, nargs="+", default=[0, 1000, 10000, 100000, 500000])
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--image-px", type=int, default=3000, help="Long edge of the uploaded image")
+    parser.add_argument("--video-mb", type=int, default=20, help="Size of the uploaded video")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    try:
+        report = asyncio.run(run_suite(args))
+    finally:
+        if WORKDIR:
+            shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
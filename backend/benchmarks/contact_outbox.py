@@ -0,0 +1,175 @@
+"""
+Contact endpoint latency and outbox delivery against a slow local SMTP server.
+
+Starts an SMTP stand-in on 127.0.0.1 that waits --smtp-delay seconds before
+every reply and answers every --fail-every'th message with a transient 451.
+For each profile, --messages contact messages are posted from --concurrency
+clients while the outbox sender runs, then the run waits for every message
+to be delivered:
+
+    pooled         one connection reused for the whole run (the default)
+    per-message    a new connection per message (SMTP_MAX_MESSAGES_PER_CONNECTION=1)
+
+Endpoint latency should not depend on --smtp-delay; delivery time shows
+what connection reuse saves. Failed messages are retried (the backoff is
+shortened with OUTBOX_RETRY_BASE_SECONDS=0.1 unless it is set).
+
+    python -m benchmarks.contact_outbox --messages 200 --smtp-delay 0.05
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp())
+os.environ.setdefault("OUTBOX_RETRY_BASE_SECONDS", "0.1")
+# The stand-in listens on 127.0.0.1; its port is set once it is running
+os.environ["SMTP_HOST"] = "127.0.0.1"
+os.environ["SMTP_STARTTLS"] = "false"
+os.environ.pop("SMTP_USERNAME", None)
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+from app import models, outbox  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.sqlite_writes import percentile  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("app").setLevel(logging.WARNING)
+
+
+class SMTPStandIn:
+    """Just enough of an SMTP server for smtplib: accepts and counts messages"""
+
+    def __init__(self, delay: float, fail_every: int):
+        self.delay = delay
+        self.fail_every = fail_every
+        self.connections = 0
+        self.messages = 0
+        self.refused = 0
+        self._data = itertools.count(1)
+
+    async def _reply(self, writer: asyncio.StreamWriter, line: str) -> None:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        writer.write(f"{line}\r\n".encode())
+        await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        await self._reply(writer, "220 stand-in ready")
+        try:
+            while line := await reader.readline():
+                command = line.decode(errors="replace").strip().upper()
+                if command.startswith("EHLO"):
+                    await self._reply(writer, "250-stand-in\r\n250 8BITMIME")
+                elif command == "DATA":
+                    await self._reply(writer, "354 end with .")
+                    while (await reader.readline()) not in (b".\r\n", b""):
+                        pass
+                    if self.fail_every and next(self._data) % self.fail_every == 0:
+                        self.refused += 1
+                        await self._reply(writer, "451 try again later")
+                    else:
+                        self.messages += 1
+                        await self._reply(writer, "250 queued")
+                elif command == "QUIT":
+                    await self._reply(writer, "221 bye")
+                    break
+                else:
+                    await self._reply(writer, "250 OK")
+        finally:
+            writer.close()
+
+
+async def run_profile(name: str, per_connection: int, server: SMTPStandIn, args) -> dict:
+    settings.SMTP_MAX_MESSAGES_PER_CONNECTION = per_connection
+    server.connections = server.messages = server.refused = 0
+    sender = asyncio.create_task(outbox.run_outbox_sender())
+
+    latencies = []
+    counter = itertools.count()
+    started = time.perf_counter()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while (i := next(counter)) < args.messages:
+                sent = time.perf_counter()
+                response = await client.post("/contact/", json={
+                    "name": f"Bench {i}", "email": f"bench{i}@example.com", "message": "Benchmark contact message",
+                })
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - sent)
+
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+    pending = select(func.count()).select_from(models.OutboundEmail).where(
+        models.OutboundEmail.status == outbox.PENDING
+    )
+    while True:
+        with engine.connect() as conn:
+            if not conn.execute(pending).scalar_one():
+                break
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    sender.cancel()
+    await asyncio.gather(sender, return_exceptions=True)
+
+    with engine.begin() as conn:
+        dead = conn.execute(select(func.count()).select_from(models.OutboundEmail).where(
+            models.OutboundEmail.status == outbox.DEAD
+        )).scalar_one()
+        conn.execute(models.OutboundEmail.__table__.delete())
+    return {
+        "profile": name,
+        "messages": args.messages,
+        "endpoint_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "endpoint_p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "delivered_in_s": round(elapsed, 2),
+        "messages_per_sec": round(server.messages / elapsed, 1),
+        "smtp_connections": server.connections,
+        "retried": server.refused,
+        "dead": dead,
+    }
+
+
+async def main(args) -> list:
+    server = SMTPStandIn(args.smtp_delay, args.fail_every)
+    smtp = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    settings.SMTP_PORT = smtp.sockets[0].getsockname()[1]
+    try:
+        return [
+            await run_profile("pooled", 100, server, args),
+            await run_profile("per-message", 1, server, args),
+        ]
+    finally:
+        smtp.close()
+        await smtp.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100, help="Contact messages per profile")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--smtp-delay", type=float, default=0.02, help="Seconds before every SMTP reply")
+    parser.add_argument("--fail-every", type=int, default=10, help="Refuse every Nth message with 451 (0: never)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            print(
+                f"{r['profile']:>11}: endpoint p50 {r['endpoint_p50_ms']}ms p99 {r['endpoint_p99_ms']}ms, "
+                f"{r['messages']} delivered in {r['delivered_in_s']}s ({r['messages_per_sec']} msg/s) "
+                f"over {r['smtp_connections']} connections, {r['retried']} retried, {r['dead']} dead"
+            )
@@ -0,0 +1,120 @@
+"""
+Login load benchmark: latency of other endpoints while logins are running.
+
+Drives the app in-process (httpx ASGI transport, one event loop, like a single
+uvicorn worker). Login workers sign in back to back while probes call
+GET /health and GET /auth/me; both profiles report the probe p50/p99 and the
+login throughput. The "inline" profile hashes on the event loop, as the login
+endpoint used to; the "pool" profile uses the bounded password pool.
+
+    python -m benchmarks.login_load --logins 8 --seconds 5
+    PASSWORD_HASH_SCHEME=argon2 python -m benchmarks.login_load
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp())
+
+import httpx  # noqa: E402
+from app import auth  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.sqlite_writes import percentile  # noqa: E402
+
+EMAIL = "bench@example.com"
+PASSWORD = "benchmark-password"
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+pool = auth.password_hasher
+
+
+class InlineHasher:
+    """Runs hashing directly on the event loop, for comparison"""
+
+    async def run(self, fn, *args):
+        return fn(*args)
+
+
+async def run_profile(name: str, client: httpx.AsyncClient, token: str, logins: int, probes: int, seconds: float) -> dict:
+    auth.password_hasher = InlineHasher() if name == "inline" else pool
+    login_latencies, probe_latencies = [], []
+    rejected = 0
+    deadline = time.perf_counter() + seconds
+
+    async def login_worker():
+        nonlocal rejected
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.post("/auth/login", data={"username": EMAIL, "password": PASSWORD})
+            if response.status_code == 503:
+                rejected += 1
+                await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+                continue
+            response.raise_for_status()
+            login_latencies.append(time.perf_counter() - started)
+
+    async def probe_worker():
+        headers = {"Authorization": f"Bearer {token}"}
+        while time.perf_counter() < deadline:
+            for path in ("/health", "/auth/me"):
+                started = time.perf_counter()
+                (await client.get(path, headers=headers)).raise_for_status()
+                probe_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*[login_worker() for _ in range(logins)], *[probe_worker() for _ in range(probes)])
+    return {
+        "profile": name,
+        "scheme": auth.pwd_context.default_scheme(),
+        "logins": len(login_latencies),
+        "logins_per_sec": round(len(login_latencies) / seconds, 1),
+        "login_p50_ms": round(percentile(login_latencies, 50) * 1000, 2),
+        "login_p99_ms": round(percentile(login_latencies, 99) * 1000, 2),
+        "login_rejected": rejected,
+        "probes": len(probe_latencies),
+        "probe_p50_ms": round(percentile(probe_latencies, 50) * 1000, 2),
+        "probe_p99_ms": round(percentile(probe_latencies, 99) * 1000, 2),
+    }
+
+
+async def main(args) -> list:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/auth/register", json={"email": EMAIL, "password": PASSWORD})
+        if response.status_code not in (201, 400):
+            response.raise_for_status()
+        response = await client.post("/auth/login", data={"username": EMAIL, "password": PASSWORD})
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+        results = []
+        for name in ("inline", "pool"):
+            results.append(await run_profile(name, client, token, args.logins, args.probes, args.seconds))
+    pool.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=8, help="Concurrent login workers")
+    parser.add_argument("--probes", type=int, default=2, help="Concurrent probe workers")
+    parser.add_argument("--seconds", type=float, default=5, help="Duration of each profile")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            print(
+                f"{r['profile']:>6} ({r['scheme']}): {r['logins_per_sec']:>6} logins/s "
+                f"(p50 {r['login_p50_ms']}ms, p99 {r['login_p99_ms']}ms, {r['login_rejected']} rejected) | "
+                f"other endpoints p50 {r['probe_p50_ms']}ms, p99 {r['probe_p99_ms']}ms over {r['probes']} requests"
+            )
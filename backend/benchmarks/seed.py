@@ -0,0 +1,151 @@
+"""
+Scaled-data generator: users with 10k to 1M reports each.
+
+Inserts directly through the synchronous engine in large batches (far faster
+than the API), with deterministic pseudo-random content so two runs with the
+same arguments produce the same data. Every report shares one small
+placeholder image whose media_blobs row holds the matching reference count,
+so deleting seeded reports behaves like deleting real ones. Rollups are
+rebuilt at the end; the full-text index is kept in sync by its triggers.
+
+Seeds the configured DATABASE_URL. Run from the backend directory:
+
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.seed --users 2 --reports 100000
+"""
+import argparse
+import hashlib
+import io
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from PIL import Image
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Engine
+
+from app import models
+from app.auth import get_password_hash
+from app.config import settings
+from app.geo import encode_geohash
+from app.media import content_path
+from app.stats import rebuild_rollups
+
+PASSWORD = "benchmark-password"
+BATCH_SIZE = 10000
+
+_WORDS = (
+    "dog cat bike car bus truck noise parking crossing light street park bench "
+    "sidewalk blocked broken fast slow loud night morning driver cyclist pedestrian "
+    "lane signal corner school market bridge tunnel station delivery scooter"
+).split()
+_DEVICE = (
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8 Pro) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0.6367.82 Mobile Safari/537.36"
+)
+
+
+def user_email(index: int) -> str:
+    return f"bench{index}@example.com"
+
+
+def _placeholder_media() -> str:
+    """Write the shared placeholder image and return its media_path"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (90, 140, 200)).save(buffer, "JPEG")
+    data = buffer.getvalue()
+    path = content_path(settings.UPLOAD_DIR, hashlib.sha256(data).hexdigest(), ".jpg")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _report_rows(rng: random.Random, user_id: int, count: int, media_path: str, start: datetime) -> List[dict]:
+    span = (datetime.utcnow() - start).total_seconds()
+    rows = []
+    for _ in range(count):
+        latitude, longitude = None, None
+        if rng.random() < 0.8:
+            latitude = 48.8566 + rng.uniform(-0.3, 0.3)
+            longitude = 2.3522 + rng.uniform(-0.5, 0.5)
+        rows.append({
+            "user_id": user_id,
+            "media_type": "image",
+            "media_path": media_path,
+            "description": " ".join(rng.choices(_WORDS, k=rng.randint(5, 40))),
+            "behavior_rating": rng.randint(1, 5),
+            "severity_index": rng.randint(0, 100),
+            "latitude": latitude,
+            "longitude": longitude,
+            "geohash": encode_geohash(latitude, longitude) if latitude is not None else None,
+            "device_info": _DEVICE,
+            "camera_used": rng.choice(("front", "environment", "upload")),
+            "created_at": start + timedelta(seconds=rng.uniform(0, span)),
+        })
+    return rows
+
+
+def seed_database(engine: Engine, users: int, reports_per_user: int, seed: int = 1, days: int = 730) -> List[int]:
+    """
+    Create users bench0..bench{users-1}@example.com (password PASSWORD), each
+    with reports_per_user reports spread over the last `days` days. Users that
+    already exist are reused and topped up. Returns the user ids.
+    """
+    rng = random.Random(seed)
+    hashed_password = get_password_hash(PASSWORD)
+    media_path = _placeholder_media()
+    start = datetime.utcnow() - timedelta(days=days)
+    user_ids = []
+    added = 0
+
+    with engine.begin() as conn:
+        for index in range(users):
+            email = user_email(index)
+            user_id = conn.execute(select(models.User.id).where(models.User.email == email)).scalar()
+            if user_id is None:
+                user_id = conn.execute(
+                    insert(models.User).values(email=email, hashed_password=hashed_password).returning(models.User.id)
+                ).scalar_one()
+            user_ids.append(user_id)
+
+            existing = conn.execute(
+                select(func.count()).select_from(models.Report).where(models.Report.user_id == user_id)
+            ).scalar_one()
+            for offset in range(existing, reports_per_user, BATCH_SIZE):
+                count = min(BATCH_SIZE, reports_per_user - offset)
+                conn.execute(insert(models.Report), _report_rows(rng, user_id, count, media_path, start))
+                added += count
+
+        if added:
+            references = conn.execute(
+                select(func.count()).select_from(models.Report).where(models.Report.media_path == media_path)
+            ).scalar_one()
+            blob = models.MediaBlob.__table__
+            conn.execute(blob.delete().where(blob.c.path == media_path))
+            conn.execute(insert(blob).values(
+                path=media_path,
+                sha256=os.path.basename(media_path).split(".")[0],
+                size=os.path.getsize(media_path),
+                ref_count=references,
+            ))
+            rebuild_rollups(conn)
+    return user_ids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1, help="Users to create")
+    parser.add_argument("--reports", type=int, default=10000, help="Reports per user")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--days", type=int, default=730, help="Spread created_at over this many days")
+    args = parser.parse_args()
+
+    from app.database import engine
+    from app.migrations import run_migrations
+
+    run_migrations(engine)
+    started = time.perf_counter()
+    ids = seed_database(engine, args.users, args.reports, args.seed, args.days)
+    print(f"Seeded {len(ids)} users x {args.reports} reports in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,119 @@
+"""
+Per-row CPU cost of a 100-row report page, ORM + pydantic versus row tuples + orjson.
+
+"orm" is the previous read path of list_reports/get_report: full Report
+entities through the identity map, validated into ReportResponse with
+from_attributes, dumped to JSON-able data and encoded with json.dumps as
+FastAPI's JSONResponse does. "rows" is the current path: only the response
+columns as row tuples, turned into dicts by report_dict and encoded by
+orjson. Both fetch the same page from a seeded SQLite database; CPU time is
+split into fetch (query + row materialization) and serialize.
+
+    python -m benchmarks.serialization --pages 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import List, Tuple
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp())
+
+import orjson  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import update  # noqa: E402
+from app import models, schemas  # noqa: E402
+from app.database import AsyncSessionLocal, engine  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.queries import ReportFilters, report_list_query  # noqa: E402
+from app.serialization import report_columns_query, report_dict  # noqa: E402
+from benchmarks.seed import seed_database  # noqa: E402
+
+PAGE_SIZE = 100
+
+RENDITIONS = [
+    {"name": name, "width": width, "height": width * 3 // 4, "format": "webp", "path": f"uploads/ab/cd/{name}.webp"}
+    for name, width in (("thumb", 300), ("detail", 1080), ("full", 2048))
+]
+
+report_list = TypeAdapter(List[schemas.ReportResponse])
+
+
+async def orm_page(db, query) -> Tuple[float, bytes]:
+    reports = (await db.execute(query)).scalars().all()
+    fetched = time.process_time()
+    content = report_list.dump_python(report_list.validate_python(reports, from_attributes=True), mode="json")
+    body = json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+    return fetched, body
+
+
+async def rows_page(db, query) -> Tuple[float, bytes]:
+    rows = (await db.execute(report_columns_query(query))).all()
+    fetched = time.process_time()
+    body = orjson.dumps([report_dict(row) for row in rows])
+    return fetched, body
+
+
+async def run_profile(name: str, page, user_id: int, pages: int, offsets: int) -> dict:
+    base = report_list_query(user_id, ReportFilters())
+    fetch = serialize = 0.0
+    async with AsyncSessionLocal() as db:
+        for i in range(pages):
+            query = base.offset((i % offsets) * PAGE_SIZE).limit(PAGE_SIZE)
+            started = time.process_time()
+            fetched, body = await page(db, query)
+            fetch += fetched - started
+            serialize += time.process_time() - fetched
+            # Like a request-scoped session: nothing stays in the identity map
+            db.expunge_all()
+    rows = pages * PAGE_SIZE
+    return {
+        "profile": name,
+        "pages": pages,
+        "fetch_us_per_row": round(fetch / rows * 1e6, 2),
+        "serialize_us_per_row": round(serialize / rows * 1e6, 2),
+        "total_us_per_row": round((fetch + serialize) / rows * 1e6, 2),
+        "page_bytes": len(body),
+    }
+
+
+async def main(args) -> list:
+    run_migrations(engine)
+    user_id = seed_database(engine, 1, args.reports)[0]
+    with engine.begin() as conn:
+        conn.execute(update(models.Report).where(models.Report.user_id == user_id).values(renditions=RENDITIONS))
+    offsets = max(args.reports // PAGE_SIZE, 1)
+
+    # Identical output is the point of the comparison
+    async with AsyncSessionLocal() as db:
+        query = report_list_query(user_id, ReportFilters()).limit(PAGE_SIZE)
+        assert json.loads((await orm_page(db, query))[1]) == json.loads((await rows_page(db, query))[1])
+
+    results = []
+    for name, page in (("orm", orm_page), ("rows", rows_page)):
+        await run_profile(name, page, user_id, 20, offsets)  # warm-up
+        results.append(await run_profile(name, page, user_id, args.pages, offsets))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300, help="Pages fetched per profile")
+    parser.add_argument("--reports", type=int, default=10000, help="Reports seeded")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            print(
+                f"{r['profile']:>5}: {r['total_us_per_row']:>7}us/row "
+                f"(fetch {r['fetch_us_per_row']}us, serialize {r['serialize_us_per_row']}us) "
+                f"over {r['pages']} pages of {PAGE_SIZE}"
+            )
+        print(f"orm/rows CPU per row: {results[0]['total_us_per_row'] / results[1]['total_us_per_row']:.2f}x")
@@ -0,0 +1,129 @@
+"""
+Concurrent write/read benchmark for the SQLite production profile.
+
+Runs the same workload twice against a fresh SQLite file: concurrent report
+inserts (one transaction each, like create_report) alongside readers running
+the list_reports query. The "default" profile uses SQLite's stock rollback
+journal with unserialized writers; the "tuned" profile applies
+apply_sqlite_pragmas and routes writes through SerializedWriter.
+
+    python -m benchmarks.sqlite_writes --writers 16 --writes 50 --readers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app import models
+from app.database import Base, SerializedWriter, apply_sqlite_pragmas
+from app.queries import ReportFilters, report_list_query
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run_profile(name: str, tuned: bool, writers: int, writes: int, readers: int) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    sync_engine = create_engine(f"sqlite:///{path}")
+    if tuned:
+        event.listen(sync_engine, "connect", apply_sqlite_pragmas)
+    Base.metadata.create_all(sync_engine)
+    with sync_engine.begin() as conn:
+        conn.execute(models.User.__table__.insert().values(id=1, email="bench@example.com", hashed_password="x"))
+    sync_engine.dispose()
+
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool, pool_size=writers + readers
+    )
+    if tuned:
+        event.listen(engine.sync_engine, "connect", apply_sqlite_pragmas)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    writer_gate = SerializedWriter(enabled=tuned)
+
+    errors = 0
+    write_latencies, read_latencies = [], []
+    done = asyncio.Event()
+
+    async def writer(worker: int):
+        nonlocal errors
+        for i in range(writes):
+            started = time.perf_counter()
+            try:
+                async with Session() as db:
+                    async with writer_gate():
+                        db.add(models.Report(
+                            user_id=1, media_type="image", media_path=f"uploads/{worker}-{i}.jpg",
+                            description="benchmark report " * 8, behavior_rating=i % 5 + 1,
+                            severity_index=i % 101, device_info="bench",
+                        ))
+                        await db.commit()
+                write_latencies.append(time.perf_counter() - started)
+            except OperationalError:
+                errors += 1
+
+    async def reader():
+        query = report_list_query(1, ReportFilters()).limit(10)
+        while not done.is_set():
+            started = time.perf_counter()
+            async with Session() as db:
+                (await db.execute(query)).scalars().all()
+            read_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0)
+
+    reader_tasks = [asyncio.create_task(reader()) for _ in range(readers)]
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(w) for w in range(writers)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await asyncio.gather(*reader_tasks)
+    await engine.dispose()
+
+    return {
+        "profile": name,
+        "writes": len(write_latencies),
+        "write_errors": errors,
+        "writes_per_sec": round(len(write_latencies) / elapsed, 1),
+        "write_p50_ms": round(percentile(write_latencies, 50) * 1000, 2),
+        "write_p99_ms": round(percentile(write_latencies, 99) * 1000, 2),
+        "reads": len(read_latencies),
+        "read_p50_ms": round(percentile(read_latencies, 50) * 1000, 2),
+        "read_p99_ms": round(percentile(read_latencies, 99) * 1000, 2),
+    }
+
+
+async def main(args) -> list:
+    results = []
+    for name, tuned in (("default", False), ("tuned", True)):
+        results.append(await run_profile(name, tuned, args.writers, args.writes, args.readers))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=16, help="Concurrent writers")
+    parser.add_argument("--writes", type=int, default=50, help="Inserts per writer")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent list_reports readers")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            print(
+                f"{r['profile']:>8}: {r['writes_per_sec']:>8} writes/s "
+                f"(p50 {r['write_p50_ms']}ms, p99 {r['write_p99_ms']}ms, {r['write_errors']} errors) | "
+                f"reads p50 {r['read_p50_ms']}ms, p99 {r['read_p99_ms']}ms over {r['reads']} queries"
+            )
+        speedup = results[1]["writes_per_sec"] / max(results[0]["writes_per_sec"], 0.1)
+        print(f"tuned/default write throughput: {speedup:.2f}x")
@@ -0,0 +1,112 @@
+"""
+Check that every list_reports/get_report query shape is served by an index.
+
+Runs EXPLAIN against the configured DATABASE_URL (SQLite or PostgreSQL) after
+applying migrations, and fails if a query scans the reports table, does not
+use the index meant to serve it (the (user_id, geohash) index for geo
+filters, the full-text index for search) or needs a separate sort step.
+Planners pick differently on an empty table, so run it from the backend
+directory against a seeded one:
+
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.seed --reports 100000
+    DATABASE_URL=sqlite:///./bench.db python verify_indexes.py
+"""
+import itertools
+import sys
+from typing import Optional
+from sqlalchemy import text, tuple_
+from app import models
+from app.database import engine
+from app.migrations import run_migrations
+from app.queries import (
+    ReportFilters, GeoFilter, SORT_COLUMNS, apply_geo_filter, apply_report_filters,
+    report_list_query, report_by_id_query,
+)
+from app.search import apply_search
+
+
+def query_shapes(dialect: str):
+    """
+    Yield (label, statement, required_index, sorted_by_index) for each query
+    shape that list_reports/get_report issue. required_index must appear in
+    the plan (None: any index will do). With range filters on another column
+    the planner may legitimately pick that column's index and sort the
+    matches, and geo and search shapes sort their candidates.
+    """
+    for sort_by, sort_order in itertools.product(SORT_COLUMNS, ("asc", "desc")):
+        index = f"ix_reports_user_{sort_by}"
+        stmt = report_list_query(1, ReportFilters(), sort_by, sort_order).limit(11)
+        yield f"list sort_by={sort_by} {sort_order}", stmt, index, True
+
+        key = tuple_(getattr(models.Report, sort_by), models.Report.id)
+        value = "2024-01-01 00:00:00" if sort_by == "created_at" else 3
+        after = key < (value, 100) if sort_order == "desc" else key > (value, 100)
+        yield f"list sort_by={sort_by} {sort_order} cursor", stmt.where(after), index, True
+
+    filters = ReportFilters(rating_min=2, severity_max=80)
+    yield "list filtered", report_list_query(1, filters).limit(11), None, False
+    yield "get/delete by id", report_by_id_query(1, 1), None, True
+
+    narrowed = report_list_query(1, ReportFilters(), narrowed=True)
+    bbox = GeoFilter(min_lat=48.8, min_lon=2.2, max_lat=48.9, max_lon=2.4)
+    yield "list bounding box", apply_geo_filter(narrowed, bbox, 1).limit(11), "ix_reports_user_geohash", False
+    circle = GeoFilter(near_lat=48.85, near_lon=2.35, radius_m=2000)
+    yield "list radius", apply_geo_filter(narrowed, circle, 1).limit(11), "ix_reports_user_geohash", False
+
+    search_index = {"sqlite": "reports_fts", "postgresql": "ix_reports_search_vector"}.get(dialect)
+    if search_index:
+        searched, _ = apply_search(narrowed, "dog", dialect)
+        yield "list search", searched.limit(11), search_index, False
+        yield "list search filtered", apply_report_filters(searched, filters).limit(11), search_index, False
+
+
+def explain(conn, stmt) -> str:
+    """Return the query plan of a statement as text"""
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        return "\n".join(row[-1] for row in rows)
+    rows = conn.execute(text(f"EXPLAIN {sql}")).fetchall()
+    return "\n".join(row[0] for row in rows)
+
+
+def uses_index(conn, plan: str, required_index: Optional[str], sorted_by_index: bool) -> bool:
+    """
+    Whether a plan reads reports through an index (required_index, if given)
+    and, if required, without a sort step
+    """
+    if required_index and required_index not in plan:
+        return False
+    if conn.dialect.name == "sqlite":
+        lines = plan.splitlines()
+        scans_table = any(line.strip() == "SCAN reports" for line in lines)
+        sorts = "TEMP B-TREE" in plan
+        # The outer loop must be the index itself or a rowid lookup of the
+        # candidates it produced, not another index probing it row by row
+        if required_index and not (required_index in lines[0] or "INTEGER PRIMARY KEY" in lines[0]):
+            return False
+    else:
+        scans_table = "Seq Scan on reports" in plan
+        sorts = "Sort" in plan
+    return not scans_table and not (sorted_by_index and sorts)
+
+
+def verify_indexes() -> bool:
+    run_migrations(engine)
+    ok = True
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # Tiny tables are cheaper to scan; ask whether an index *can* serve the query
+            conn.execute(text("SET enable_seqscan = off"))
+        for label, stmt, required_index, sorted_by_index in query_shapes(conn.dialect.name):
+            plan = explain(conn, stmt)
+            if uses_index(conn, plan, required_index, sorted_by_index):
+                print(f"PASS: {label}")
+            else:
+                ok = False
+                print(f"FAIL: {label}\n{plan}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify_indexes() else 1)
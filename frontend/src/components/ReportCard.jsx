@@ -12,6 +12,18 @@ export function ReportCard({ report, onClick }) {
         });
     };
 
+    // WebP renditions as a srcset; the JPEG thumbnail stays the fallback <img>
+    const renditionSrcSet = report.renditions?.length
+        ? report.renditions.map((r) => `/api/${r.path} ${r.width}w`).join(', ')
+        : null;
+
+    // Search snippets mark matches with <mark>; render them as elements, never as HTML
+    const renderSnippet = (snippet) => snippet.split(/(<mark>.*?<\/mark>)/g).map((part, i) => (
+        part.startsWith('<mark>')
+            ? <mark key={i}>{part.slice(6, -7)}</mark>
+            : part
+    ));
+
     const getSeverityColor = (val) => {
         if (val < 30) return 'var(--success)';
         if (val < 60) return 'var(--warning)';
@@ -29,20 +41,31 @@ export function ReportCard({ report, onClick }) {
                 background: 'var(--background)'
             }}>
                 {report.media_type === 'image' ? (
-                    <img
-                        src={report.thumbnail_path ? `/api/${report.thumbnail_path}` : `/api/${report.media_path}`}
-                        alt="Report media"
-                        style={{ width: '100%', height: '100%', objectFit: 'cover' }}
-                        onError={(e) => {
-                            // Fallback to original if thumbnail fails
-                            if (report.thumbnail_path && e.target.src.includes(report.thumbnail_path)) {
-                                e.target.src = `/api/${report.media_path}`;
-                            }
-                        }}
-                    />
+                    <picture>
+                        {renditionSrcSet && (
+                            <source
+                                type={`image/${report.renditions[0].format}`}
+                                srcSet={renditionSrcSet}
+                                sizes="(max-width: 600px) 100vw, 300px"
+                            />
+                        )}
+                        <img
+                            src={report.thumbnail_path ? `/api/${report.thumbnail_path}` : `/api/${report.media_path}`}
+                            alt="Report media"
+                            loading="lazy"
+                            style={{ width: '100%', height: '100%', objectFit: 'cover' }}
+                            onError={(e) => {
+                                // Fallback to original if thumbnail fails
+                                if (report.thumbnail_path && e.target.src.includes(report.thumbnail_path)) {
+                                    e.target.src = `/api/${report.media_path}`;
+                                }
+                            }}
+                        />
+                    </picture>
                 ) : (
                     <video
                         src={`/api/${report.media_path}`}
+                        preload="metadata"
                         style={{ width: '100%', height: '100%', objectFit: 'cover' }}
                     />
                 )}
@@ -65,7 +88,7 @@ export function ReportCard({ report, onClick }) {
                     WebkitBoxOrient: 'vertical',
                     fontWeight: '500'
                 }}>
-                    {report.description}
+                    {report.snippet ? renderSnippet(report.snippet) : report.description}
                 </p>
             </div>
 
@@ -5,8 +5,81 @@ import { StarRating } from '../components/StarRating';
 import { SeveritySlider } from '../components/SeveritySlider';
 import { useGeolocation } from '../hooks/useGeolocation';
 import { useTranslation } from 'react-i18next';
+import axios from 'axios';
 import apiClient from '../api/client';
 
+async function sha256Hex(file) {
+    const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+}
+
+// Direct upload: the API hands out a presigned URL (object storage when
+// configured) so the media bytes do not pass through the API workers.
+// Resolves to the upload token that POST /reports/finalize expects.
+async function uploadDirect(file, onUploadProgress) {
+    const { data: ticket } = await apiClient.post('/reports/uploads', {
+        filename: file.name,
+        content_type: file.type,
+        size: file.size,
+        sha256: await sha256Hex(file),
+    });
+    if (!ticket.already_stored) {
+        const config = { headers: ticket.headers, onUploadProgress };
+        if (ticket.url.startsWith('/')) {
+            await apiClient.put(ticket.url, file, config);
+        } else {
+            await axios.put(ticket.url, file, config);
+        }
+    }
+    return ticket.upload_token;
+}
+
+const CHUNK_SIZE = 2 * 1024 * 1024;
+const MAX_RETRIES = 5;
+
+// Resumable upload for videos: the file is sent in chunks and, when the
+// connection drops, resumed from the offset the server has stored.
+// Resolves to the finalize URL of the completed upload session.
+async function uploadResumable(file, onUploadProgress) {
+    const { data: session, headers } = await apiClient.post('/reports/uploads/resumable', {
+        filename: file.name,
+        content_type: file.type,
+        size: file.size,
+    });
+    const sessionUrl = headers.location || `/reports/uploads/resumable/${session.id}`;
+    let offset = session.offset;
+    let retries = 0;
+
+    while (offset < file.size) {
+        try {
+            const response = await apiClient.patch(sessionUrl, file.slice(offset, offset + CHUNK_SIZE), {
+                headers: {
+                    'Content-Type': 'application/offset+octet-stream',
+                    'Upload-Offset': offset,
+                },
+            });
+            offset = Number(response.headers['upload-offset']);
+            retries = 0;
+            onUploadProgress({ loaded: offset, total: file.size });
+        } catch (err) {
+            // 409: offset mismatch; 429/503: server asked us to back off
+            if (err.response && ![409, 429, 503].includes(err.response.status)) throw err;
+            if (++retries > MAX_RETRIES) throw err;
+            const retryAfter = Number(err.response?.headers['retry-after']);
+            const delay = retryAfter ? retryAfter * 1000 : 1000 * 2 ** (retries - 1);
+            await new Promise((resolve) => setTimeout(resolve, delay));
+            try {
+                // Ask the server how much it kept before resuming
+                const head = await apiClient.head(sessionUrl);
+                offset = Number(head.headers['upload-offset']);
+            } catch {
+                // Still offline: retry the same chunk after the next backoff
+            }
+        }
+    }
+    return `${sessionUrl}/finalize`;
+}
+
 export function CreateReport() {
     const [mediaFile, setMediaFile] = useState(null);
     const [cameraUsed, setCameraUsed] = useState(null);
@@ -73,13 +146,30 @@ export function CreateReport() {
         const deviceInfo = `${navigator.platform} - ${navigator.userAgent}`;
         formData.append('device_info', deviceInfo);
 
+        const onUploadProgress = (progressEvent) => {
+            const percentCompleted = Math.round((progressEvent.loaded * 100) / progressEvent.total);
+            setUploadProgress(percentCompleted);
+        };
+
         try {
-            await apiClient.post('/reports/', formData, {
-                onUploadProgress: (progressEvent) => {
-                    const percentCompleted = Math.round((progressEvent.loaded * 100) / progressEvent.total);
-                    setUploadProgress(percentCompleted);
-                },
-            });
+            const report = {
+                description,
+                behavior_rating: behaviorRating,
+                severity_index: severityIndex,
+                camera_used: cameraUsed,
+                latitude: location?.latitude ?? null,
+                longitude: location?.longitude ?? null,
+            };
+            if (mediaFile.type.startsWith('video/')) {
+                const finalizeUrl = await uploadResumable(mediaFile, onUploadProgress);
+                await apiClient.post(finalizeUrl, report);
+            } else if (window.crypto?.subtle) {
+                // crypto.subtle is only available in secure contexts (HTTPS/localhost)
+                const uploadToken = await uploadDirect(mediaFile, onUploadProgress);
+                await apiClient.post('/reports/finalize', { ...report, upload_token: uploadToken });
+            } else {
+                await apiClient.post('/reports/', formData, { onUploadProgress });
+            }
             setShowSuccessModal(true);
         } catch (err) {
             console.error('Report submission error:', err);
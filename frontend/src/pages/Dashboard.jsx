@@ -1,10 +1,30 @@
+import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { useAuth } from '../hooks/useAuth';
 import { useTranslation } from 'react-i18next';
+import apiClient from '../api/client';
 
 export function Dashboard() {
     const { user } = useAuth();
     const { t } = useTranslation();
+    const [stats, setStats] = useState(null);
+
+    useEffect(() => {
+        apiClient.get('/reports/stats')
+            .then((response) => setStats(response.data))
+            .catch(() => setStats(null));
+    }, []);
+
+    const averageRating = stats?.total_reports
+        ? (Object.entries(stats.rating_distribution)
+            .reduce((sum, [rating, count]) => sum + rating * count, 0) / stats.total_reports).toFixed(1)
+        : '–';
+    const lastWeekCount = stats
+        ? stats.daily
+            .filter((d) => new Date(d.day) >= new Date(Date.now() - 7 * 24 * 3600 * 1000))
+            .reduce((sum, d) => sum + d.count, 0)
+        : 0;
+    const maxBucket = stats ? Math.max(1, ...stats.severity_histogram.map((b) => b.count)) : 1;
 
     // Extract first name from email (e.g., "bastien.caspani@web.com" -> "Bastien")
     const firstName = user?.email
@@ -22,6 +42,42 @@ export function Dashboard() {
                 </p>
             </div>
 
+            {/* Statistics */}
+            {stats && (
+                <div className="card">
+                    <div style={{ display: 'grid', gridTemplateColumns: 'repeat(3, 1fr)', gap: '1rem', textAlign: 'center' }}>
+                        <div>
+                            <div style={{ fontSize: '2rem', fontWeight: '700', color: 'var(--primary)' }}>{stats.total_reports}</div>
+                            <div className="text-muted">Reports</div>
+                        </div>
+                        <div>
+                            <div style={{ fontSize: '2rem', fontWeight: '700', color: 'var(--primary)' }}>{lastWeekCount}</div>
+                            <div className="text-muted">Last 7 days</div>
+                        </div>
+                        <div>
+                            <div style={{ fontSize: '2rem', fontWeight: '700', color: 'var(--primary)' }}>{averageRating}</div>
+                            <div className="text-muted">Avg. rating</div>
+                        </div>
+                    </div>
+                    <div style={{ display: 'flex', alignItems: 'flex-end', gap: '4px', height: '60px', marginTop: '1.5rem' }}>
+                        {stats.severity_histogram.map((bucket) => (
+                            <div
+                                key={bucket.severity_min}
+                                title={`Severity ${bucket.severity_min}-${bucket.severity_max}: ${bucket.count}`}
+                                style={{
+                                    flex: 1,
+                                    height: `${(bucket.count / maxBucket) * 100}%`,
+                                    minHeight: '2px',
+                                    background: 'var(--primary)',
+                                    borderRadius: '2px'
+                                }}
+                            />
+                        ))}
+                    </div>
+                    <p className="text-muted text-center" style={{ fontSize: '0.75rem', marginTop: '0.5rem' }}>Severity distribution (0 → 100)</p>
+                </div>
+            )}
+
             <div style={{
                 display: 'grid',
                 gridTemplateColumns: 'repeat(auto-fit, minmax(300px, 1fr))',
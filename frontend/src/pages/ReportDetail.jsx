@@ -56,6 +56,11 @@ export function ReportDetail() {
         });
     };
 
+    // WebP renditions as a srcset; the JPEG thumbnail stays the fallback <img>
+    const renditionSrcSet = report?.renditions?.length
+        ? report.renditions.map((r) => `/api/${r.path} ${r.width}w`).join(', ')
+        : null;
+
     const getSeverityColor = (val) => {
         if (val < 30) return 'var(--success)';
         if (val < 60) return 'var(--warning)';
@@ -103,16 +108,25 @@ export function ReportDetail() {
                     }}>
                         {report.media_type === 'image' ? (
                             <div>
-                                <img
-                                    src={report.thumbnail_path ? `/api/${report.thumbnail_path}` : `/api/${report.media_path}`}
-                                    alt="Report media"
-                                    style={{ width: '100%', maxHeight: '500px', objectFit: 'contain', display: 'block' }}
-                                    onError={(e) => {
-                                        if (report.thumbnail_path && e.target.src.includes(report.thumbnail_path)) {
-                                            e.target.src = `/api/${report.media_path}`;
-                                        }
-                                    }}
-                                />
+                                <picture>
+                                    {renditionSrcSet && (
+                                        <source
+                                            type={`image/${report.renditions[0].format}`}
+                                            srcSet={renditionSrcSet}
+                                            sizes="(max-width: 800px) 100vw, 800px"
+                                        />
+                                    )}
+                                    <img
+                                        src={report.thumbnail_path ? `/api/${report.thumbnail_path}` : `/api/${report.media_path}`}
+                                        alt="Report media"
+                                        style={{ width: '100%', maxHeight: '500px', objectFit: 'contain', display: 'block' }}
+                                        onError={(e) => {
+                                            if (report.thumbnail_path && e.target.src.includes(report.thumbnail_path)) {
+                                                e.target.src = `/api/${report.media_path}`;
+                                            }
+                                        }}
+                                    />
+                                </picture>
                                 <div style={{ padding: '1rem', textAlign: 'center', borderTop: '1px solid var(--border)' }}>
                                     <a
                                         href={`/api/${report.media_path}`}
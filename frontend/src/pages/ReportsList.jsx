@@ -9,6 +9,7 @@ export function ReportsList() {
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
     const [filters, setFilters] = useState({
+        q: '',
         date_from: '',
         date_to: '',
         rating_min: '',
@@ -20,17 +21,20 @@ export function ReportsList() {
         by: 'created_at',
         order: 'desc'
     });
+    // cursors[i] is the cursor that fetches page i (null for the first page)
     const [pagination, setPagination] = useState({
-        skip: 0,
+        cursors: [null],
+        page: 0,
         limit: 10
     });
+    const [nextCursor, setNextCursor] = useState(null);
     const { t } = useTranslation();
 
     const navigate = useNavigate();
 
     useEffect(() => {
         fetchReports();
-    }, [pagination.skip, pagination.limit, sort, filters]); // Re-fetch when these change
+    }, [pagination.page, pagination.limit, sort, filters]); // Re-fetch when these change
 
     // Force fetch on mount to ensure fresh data
     useEffect(() => {
@@ -41,7 +45,7 @@ export function ReportsList() {
         setLoading(true);
         try {
             const params = {
-                skip: pagination.skip,
+                cursor: pagination.cursors[pagination.page],
                 limit: pagination.limit,
                 sort_by: sort.by,
                 sort_order: sort.order,
@@ -57,6 +61,7 @@ export function ReportsList() {
 
             const response = await apiClient.get('/reports/', { params });
             setReports(response.data);
+            setNextCursor(response.headers['x-next-cursor'] || null);
         } catch (err) {
             setError('Failed to load reports');
         } finally {
@@ -64,6 +69,15 @@ export function ReportsList() {
         }
     };
 
+    // Streamed download of every report matching the current filters
+    const exportUrl = (format) => {
+        const params = new URLSearchParams({ format, sort_by: sort.by, sort_order: sort.order });
+        Object.entries(filters).forEach(([key, value]) => {
+            if (value !== '') params.append(key, value);
+        });
+        return `${apiClient.defaults.baseURL}/reports/export?${params}`;
+    };
+
     const handleReportClick = (reportId) => {
         navigate(`/reports/${reportId}`);
     };
@@ -71,23 +85,27 @@ export function ReportsList() {
     const handleFilterChange = (e) => {
         const { name, value } = e.target;
         setFilters(prev => ({ ...prev, [name]: value }));
-        setPagination(prev => ({ ...prev, skip: 0 })); // Reset to first page on filter change
+        setPagination(prev => ({ ...prev, cursors: [null], page: 0 })); // Reset to first page on filter change
     };
 
     const handleSortChange = (e) => {
         const { name, value } = e.target;
         setSort(prev => ({ ...prev, [name]: value }));
+        setPagination(prev => ({ ...prev, cursors: [null], page: 0 })); // Cursors are tied to the sort order
     };
 
     const handleLimitChange = (e) => {
-        setPagination(prev => ({ ...prev, limit: parseInt(e.target.value), skip: 0 }));
+        setPagination(prev => ({ ...prev, limit: parseInt(e.target.value), cursors: [null], page: 0 }));
     };
 
     const handlePageChange = (direction) => {
-        setPagination(prev => ({
-            ...prev,
-            skip: direction === 'next' ? prev.skip + prev.limit : Math.max(0, prev.skip - prev.limit)
-        }));
+        setPagination(prev => {
+            if (direction === 'next') {
+                if (!nextCursor) return prev;
+                return { ...prev, cursors: [...prev.cursors.slice(0, prev.page + 1), nextCursor], page: prev.page + 1 };
+            }
+            return { ...prev, page: Math.max(0, prev.page - 1) };
+        });
     };
 
     return (
@@ -104,12 +122,21 @@ export function ReportsList() {
                 <button onClick={fetchReports} className="btn btn-outline mt-4" style={{ fontSize: '0.875rem' }}>
                     🔄 Refresh List
                 </button>
+                <a href={exportUrl('csv')} download className="btn btn-outline mt-4" style={{ fontSize: '0.875rem', marginLeft: '0.5rem' }}>
+                    ⬇ Export CSV
+                </a>
             </div>
 
             {/* Filters and Controls */}
             <div className="card mb-4">
                 <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fit, minmax(200px, 1fr))', gap: '1rem' }}>
 
+                    {/* Search */}
+                    <div className="form-group">
+                        <label className="form-label">Search</label>
+                        <input type="search" name="q" className="form-input" placeholder="Keywords" value={filters.q} onChange={handleFilterChange} />
+                    </div>
+
                     {/* Date Range */}
                     <div className="form-group">
                         <label className="form-label">Date From</label>
@@ -202,17 +229,17 @@ export function ReportsList() {
                         <button
                             className="btn btn-outline"
                             onClick={() => handlePageChange('prev')}
-                            disabled={pagination.skip === 0}
+                            disabled={pagination.page === 0}
                         >
                             Previous
                         </button>
                         <span className="text-muted">
-                            Page {Math.floor(pagination.skip / pagination.limit) + 1}
+                            Page {pagination.page + 1}
                         </span>
                         <button
                             className="btn btn-outline"
                             onClick={() => handlePageChange('next')}
-                            disabled={reports.length < pagination.limit}
+                            disabled={!nextCursor}
                         >
                             Next
                         </button>